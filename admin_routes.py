@@ -1,10 +1,24 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, Response
 from flask_login import login_required, current_user
-from models import db, User, System, UserSystemAccess, AuditLog
+from models import db, User, UserSystemAccess, AuditLog, mark_user_changed
+from catalog import get_catalog
 from functools import wraps
+import re
+from datetime import datetime
+from sqlalchemy import insert
+from audit import audit_writer, log_access_change
+from audit_archive import search_audit
+from user_search import search_users
+from counters import get_dashboard_counters
+from metrics import render_prometheus
+from bulk_access import (
+    BulkAccessError, apply_bulk_access, build_user_selector, parse_email_list
+)
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+USERS_PAGE_SIZE = 50
+
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -19,30 +33,168 @@ def admin_required(f):
 @admin_required
 def dashboard():
     """Painel Principal do Admin"""
-    stats = {
-        'users_count': User.query.count(),
-        'systems_count': System.query.count(),
-        'active_users': User.query.filter_by(is_active=True).count()
-    }
+    stats = get_dashboard_counters()
     
-    # Recent logs
+    # Recent logs (grava antes o que este worker ainda tem em buffer)
+    audit_writer.flush()
     logs = AuditLog.query.order_by(AuditLog.created_at.desc()).limit(10).all()
     
     return render_template('admin/dashboard.html', stats=stats, logs=logs)
 
+@admin_bp.route('/metrics')
+@login_required
+@admin_required
+def metrics():
+    """Métricas de todos os workers (formato de texto do Prometheus)"""
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+def _audit_query_args():
+    """Filtros e cursor da auditoria a partir da query string"""
+    return {
+        'actor_id': request.args.get('actor', type=int),
+        'target_id': request.args.get('target', '').strip() or None,
+        'action': request.args.get('action', '').strip().upper() or None,
+        'cursor': request.args.get('cursor') or None,
+        'limit': max(1, min(request.args.get('limit', 50, type=int), 200)),
+    }
+
+@admin_bp.route('/audit')
+@login_required
+@admin_required
+def audit_log():
+    """Navegação da auditoria (banco + segmentos arquivados)"""
+    args = _audit_query_args()
+    audit_writer.flush()
+    entries, next_cursor = search_audit(**args)
+    return render_template('admin/audit.html', entries=entries, next_cursor=next_cursor, filters=args)
+
+@admin_bp.route('/api/audit')
+@login_required
+@admin_required
+def audit_log_api():
+    """Mesma consulta de /admin/audit em JSON"""
+    audit_writer.flush()
+    entries, next_cursor = search_audit(**_audit_query_args())
+    return jsonify({
+        'entries': [
+            dict(entry._asdict(), created_at=entry.created_at.isoformat())
+            for entry in entries
+        ],
+        'next_cursor': next_cursor,
+    })
+
+@admin_bp.route('/bulk-access', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def bulk_access():
+    """Conceder/revogar um sistema para vários usuários de uma vez"""
+    if request.method == 'POST':
+        emails_raw = request.form.get('emails', '')
+        upload = request.files.get('emails_file')
+        if upload and upload.filename:
+            emails_raw += '\n' + upload.read().decode('utf-8', errors='ignore')
+
+        ids_raw = request.form.get('user_ids', '')
+        try:
+            selector = build_user_selector(
+                user_ids=[uid for uid in re.split(r'[\s,;]+', ids_raw) if uid],
+                search=request.form.get('search', '').strip() or None,
+                role=request.form.get('role') or None,
+                emails=parse_email_list(emails_raw),
+                exclude_admins=current_user.role == 'manager'
+            )
+            dry_run = request.form.get('dry_run') == '1'
+            affected = apply_bulk_access(
+                request.form.get('system_id'),
+                request.form.get('operation'),
+                selector,
+                current_user.id,
+                dry_run=dry_run
+            )
+        except BulkAccessError as e:
+            db.session.rollback()
+            flash(str(e), 'error')
+            return redirect(url_for('admin.bulk_access'))
+
+        if dry_run:
+            flash(f'{len(affected)} usuário(s) seriam alterados.', 'info')
+        else:
+            flash(f'Acesso atualizado para {len(affected)} usuário(s).', 'success')
+        return redirect(url_for('admin.bulk_access'))
+
+    return render_template('admin/bulk_access.html', systems=get_catalog().systems)
+
+@admin_bp.route('/api/bulk-access', methods=['POST'])
+@login_required
+@admin_required
+def bulk_access_api():
+    """
+    Versão JSON do acesso em massa.
+
+    Corpo: {"system_id", "operation": "grant"|"revoke", "user_ids", "search",
+            "role", "emails" (lista ou texto CSV), "dry_run"}
+    """
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Corpo JSON deve ser um objeto.'}), 400
+
+    for field in ('system_id', 'operation', 'search', 'role'):
+        if payload.get(field) is not None and not isinstance(payload[field], str):
+            return jsonify({'error': f'Campo {field} deve ser texto.'}), 400
+
+    user_ids = payload.get('user_ids')
+    if user_ids is not None and (
+        not isinstance(user_ids, list)
+        or not all(isinstance(uid, (int, str)) and not isinstance(uid, bool) for uid in user_ids)
+    ):
+        return jsonify({'error': 'Campo user_ids deve ser uma lista de IDs.'}), 400
+
+    emails = payload.get('emails')
+    if isinstance(emails, list):
+        if not all(isinstance(email, str) for email in emails):
+            return jsonify({'error': 'Campo emails deve conter apenas textos.'}), 400
+        emails = '\n'.join(emails)
+    elif emails is not None and not isinstance(emails, str):
+        return jsonify({'error': 'Campo emails deve ser uma lista ou texto.'}), 400
+
+    try:
+        selector = build_user_selector(
+            user_ids=user_ids,
+            search=payload.get('search'),
+            role=payload.get('role'),
+            emails=parse_email_list(emails),
+            exclude_admins=current_user.role == 'manager'
+        )
+        affected = apply_bulk_access(
+            payload.get('system_id'),
+            payload.get('operation'),
+            selector,
+            current_user.id,
+            dry_run=bool(payload.get('dry_run'))
+        )
+    except BulkAccessError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'affected': len(affected), 'user_ids': affected, 'dry_run': bool(payload.get('dry_run'))})
+
 @admin_bp.route('/users')
 @login_required
 @admin_required
 def list_users():
     """Listagem de usuários"""
     search = request.args.get('search', '')
-    query = User.query
+    cursor = request.args.get('cursor') or None
     
-    if search:
-        query = query.filter(User.name.ilike(f'%{search}%') | User.email.ilike(f'%{search}%'))
-        
-    users = query.order_by(User.name).all()
-    return render_template('admin/users_list.html', users=users, search=search)
+    # Índice FTS (trigram) + paginação por cursor em ordem de nome
+    users, total, next_cursor = search_users(search, cursor=cursor, limit=USERS_PAGE_SIZE)
+    return render_template(
+        'admin/users_list.html',
+        users=users,
+        search=search,
+        total=total,
+        next_cursor=next_cursor
+    )
 
 @admin_bp.route('/users/<int:user_id>/permissions', methods=['GET', 'POST'])
 @login_required
@@ -70,17 +222,15 @@ def user_permissions(user_id):
                 if target_user.role != new_role:
                     target_user.role = new_role
                     # Audit Role Change
-                    log = AuditLog(
+                    audit_writer.log(
+                        'UPDATE_ROLE',
                         actor_id=current_user.id,
                         target_id=str(target_user.id),
-                        action='UPDATE_ROLE',
                         meta_info={'new_role': new_role}
                     )
-                    db.session.add(log)
         
         # 2. Update Systems Access (Sync approach)
-        # Strategy: Delete all existing and re-insert checks. 
-        # Or better: compare sets to log efficiently.
+        # Compare sets: one bulk INSERT for grants, one DELETE for revokes
         
         current_accesses = {a.system_id for a in target_user.permissions}
         new_accesses = set(allowed_systems)
@@ -89,17 +239,13 @@ def user_permissions(user_id):
         to_remove = current_accesses - new_accesses
         
         # Add Grants
-        for sys_id in to_add:
-            access = UserSystemAccess(user_id=target_user.id, system_id=sys_id, granted_by=current_user.id)
-            db.session.add(access)
-            # Log
-            log = AuditLog(
-                actor_id=current_user.id,
-                target_id=f"User:{target_user.id}",
-                action='GRANT_ACCESS',
-                meta_info={'system': sys_id}
-            )
-            db.session.add(log)
+        if to_add:
+            now = datetime.utcnow()
+            db.session.execute(insert(UserSystemAccess), [
+                {'user_id': target_user.id, 'system_id': sys_id,
+                 'granted_by': current_user.id, 'granted_at': now}
+                for sys_id in to_add
+            ])
             
         # Revokes
         if to_remove:
@@ -107,15 +253,11 @@ def user_permissions(user_id):
                 UserSystemAccess.user_id == target_user.id,
                 UserSystemAccess.system_id.in_(to_remove)
             ).delete(synchronize_session=False)
-            
-            for sys_id in to_remove:
-                log = AuditLog(
-                    actor_id=current_user.id,
-                    target_id=f"User:{target_user.id}",
-                    action='REVOKE_ACCESS',
-                    meta_info={'system': sys_id}
-                )
-                db.session.add(log)
+
+        if to_add or to_remove:
+            # INSERT/DELETE em massa não passam pelo flush do ORM
+            mark_user_changed(target_user.id)
+            log_access_change(current_user.id, target_user.id, to_add, to_remove)
         
         try:
             db.session.commit()
@@ -127,17 +269,13 @@ def user_permissions(user_id):
         return redirect(url_for('admin.user_permissions', user_id=user_id))
 
     # GET
-    systems = System.query.all()
-    # Group systems by category
-    systems_by_category = {}
-    for s in systems:
-        cat = s.category or 'Outros'
-        if cat not in systems_by_category:
-            systems_by_category[cat] = []
-        systems_by_category[cat].append(s)
+    # Catálogo em cache (já agrupado por categoria) + concessões do usuário alvo
+    catalog = get_catalog()
+    resolved_systems = target_user.load_permissions(catalog)
+    systems_by_category = catalog.by_category
 
     # Get user allowed system IDs for checkboxes
-    user_system_ids = {p.system_id for p in target_user.permissions}
+    user_system_ids = {s.id for s, granted in resolved_systems if granted}
     
     return render_template(
         'admin/user_edit.html', 
@@ -10,28 +10,56 @@ Data: 2025-12-18
 """
 
 import os
+import hashlib
 from datetime import datetime
 from dotenv import load_dotenv
 
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, session
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_mail import Mail, Message
 from itsdangerous import URLSafeTimedSerializer
+from markupsafe import Markup
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Import Models and DB
 from models import db, User, System, UserSystemAccess, AuditLog
 from admin_routes import admin_bp
+from audit import audit_writer
 
 # Import Employee Validation
 from employees import is_valid_email_domain, is_employee_registered
 
+# Caches
+import versions
+import user_snapshot
+import hashing
+import sqlite_profile
+import migrations
+import assets
+import images
+import template_cache
+import metrics
+import query_inspector
+from hashing import hash_password, verify_password, HashingBusy
+from throttle import is_blocked, is_throttled, record_failure
+from outbox import enqueue_email, start_outbox_worker
+from cache import LRUCache
+from catalog import get_catalog
+from http_cache import cached_page, conditional_dashboard
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
 # Inicializar aplicação Flask
 app = Flask(__name__)
 
+# Bytecode dos templates em disco, compartilhado entre workers (antes de usar app.jinja_env)
+template_cache.init_app(app)
+
+# Atrás do proxy do Render o IP real vem em X-Forwarded-For (usado no throttling)
+if os.environ.get('TRUSTED_PROXY_HOPS'):
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ['TRUSTED_PROXY_HOPS']))
+
 # Configurações
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
@@ -43,16 +71,31 @@ default_db_url = 'sqlite:///' + os.path.join(basedir, 'portal_mg.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', default_db_url)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-# Initialize DB
-db.init_app(app)
+# Initialize DB (WAL, pragmas e pool para vários workers; ver sqlite_profile.py)
+sqlite_profile.init_app(app, db)
+
+# Latência, SQL e hash de senhas por endpoint (exposto em /admin/metrics)
+metrics.init_app(app, db)
+
+# Detector de N+1 / orçamento de consultas (desenvolvimento; ver query_inspector.py)
+if os.environ.get('QUERY_INSPECTOR', '').lower() in ('1', 'true', 'yes'):
+    query_inspector.init_app(app)
 
 # Register Blueprints
 app.register_blueprint(admin_bp)
 
+# Arquivos estáticos versionados (/assets, gerados por `python assets.py build`)
+assets.init_app(app)
+# Imagens responsivas (srcset a partir de `python images.py build`)
+images.init_app(app)
+
+# Auditoria em lote (write-behind)
+audit_writer.init_app(app)
+
 # Configuração do Flask-Mail
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', '1').lower() in ('1', 'true', 'yes')
 app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
 
@@ -63,6 +106,26 @@ if not app.config['MAIL_USERNAME']:
 mail = Mail(app)
 serializer = URLSafeTimedSerializer(app.secret_key)
 
+# Envio de emails em segundo plano (ver outbox.py)
+app.config['OUTBOX_WORKER'] = os.environ.get('OUTBOX_WORKER', '1').lower() in ('1', 'true', 'yes')
+
+@app.before_request
+def ensure_outbox_worker():
+    if app.config['OUTBOX_WORKER']:
+        start_outbox_worker(app, mail)
+
+# Cache do grid de sistemas renderizado, por conjunto de permissões
+app.config['SYSTEMS_GRID_CACHE_SIZE'] = int(os.environ.get('SYSTEMS_GRID_CACHE_SIZE', 256))
+systems_grid_cache = LRUCache(maxsize=app.config['SYSTEMS_GRID_CACHE_SIZE'])
+
+# Política de hash calibrada (PASSWORD_HASH_BUDGET_MS): uma vez por máquina,
+# no boot, para que nenhum request pague a calibração (ver hashing.py)
+if hashing.policy.budget_ms is not None:
+    hashing.policy.resolve()
+
+# Autenticação sem consulta ao banco a cada request (snapshot na sessão)
+app.config['SESSION_USER_SNAPSHOT'] = os.environ.get('SESSION_USER_SNAPSHOT', '').lower() in ('1', 'true', 'yes')
+
 # Inicializar Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -70,145 +133,85 @@ login_manager.login_view = 'login'
 login_manager.login_message = 'Por favor, faça login para acessar esta página.'
 login_manager.login_message_category = 'info'
 
-# --- DATABASE AUTO-INIT FOR PRODUCTION ---
-# Ensure DB is created even if init_db.py wasn't called externally
+# --- ESQUEMA DO BANCO ---
+# Migrações numeradas (ver migrations.py). Com o esquema atual, custa uma
+# leitura de uma linha; migração e carga inicial rodam uma vez, sob lock.
 with app.app_context():
-    from sqlalchemy import inspect, text
     try:
-        # Check connection and tables
-        inspector = inspect(db.engine)
-        if not os.path.exists(os.path.join(basedir, 'portal_mg.db')) or 'users' not in inspector.get_table_names():
-            print("Production: Database not found or missing tables. Initializing...")
-            
-            # Create Tables
-            db.create_all()
-            
-            # Run seeding logic (Inline to avoid circular imports with init_db.py)
-            # We can import init_db function if we are careful, or just replicate the seeding here.
-            # Replicating seeding for robustness:
-            from models import System, User, UserSystemAccess
-            
-            # Check if seeding needed
-            if System.query.count() == 0:
-                print("Seeding Systems...")
-                # ... (Systems data) ...
-                systems_data = [
-                    {'id': 'portal-colaborador', 'name': 'Portal do Colaborador', 'description': 'Gerencie suas informações...', 'url': 'https://portalcolabmg.lovable.app/login', 'icon_class': 'icon-portal.png', 'category': 'main', 'is_public': True},
-                    {'id': 'sistema-comissao', 'name': 'Sistema de Cálculo de Comissão', 'description': 'Calcule suas comissões...', 'url': 'https://calculadp.lovable.app/', 'icon_class': 'icon-comissao.png', 'category': 'main', 'is_public': False},
-                    {'id': 'ponto-eletronico', 'name': 'Processamento Ponto', 'description': 'Faça upload dos espelhos...', 'url': 'https://ai.studio/apps/drive/1g4DXIeeEt42F_J29UEPp15DgEww1PkuM?fullscreenApplet=true', 'icon_class': 'icon-ponto.png', 'category': 'automation', 'is_public': False},
-                    {'id': 'adiantamento-salarial', 'name': 'Cálculo Adiantamento', 'description': 'Importe o PDF...', 'url': 'https://ai.studio/apps/drive/14NzWtRjoDQhHhwxaDIeZisxTAzIZDkvq?fullscreenApplet=true', 'icon_class': 'icon-adiantamento.png', 'category': 'automation', 'is_public': False},
-                    {'id': 'grid-x', 'name': 'GridX', 'description': 'Seu conversor inteligente para Windows...', 'url': 'https://gridx.lovable.app/', 'icon_class': 'icon-gridx.png', 'category': 'main', 'is_public': True},
-                    {'id': 'arca-mg', 'name': 'Arca MG', 'description': 'Analisador de Documentos...', 'url': 'https://arcamg.lovable.app/', 'icon_class': 'icon-arca.png', 'category': 'main', 'is_public': True},
-                    {'id': 'aeronord-convocacoes', 'name': 'Aeronord - Convocações & Recibos', 'description': 'Sistema interno para cálculo automático de convocações...', 'url': 'https://nordcv.lovable.app/cv', 'icon_class': 'icon-aeronord.png', 'category': 'main', 'is_public': True},
-                    {'id': 'calculadora-rescisao', 'name': 'Calculadora de Rescisão', 'description': 'Ferramenta automática para cálculo de rescisão trabalhista com interface intuitiva e cálculos precisos', 'url': 'https://calculadoramg.lovable.app/', 'icon_class': 'icon-rescisao.png', 'category': 'main', 'is_public': True}
-                ]
-                for s in systems_data:
-                    db.session.add(System(id=s['id'], name=s['name'], description=s['description'], url=s['url'], icon_class=s['icon_class'], category=s['category'], is_public=s['is_public']))
-                db.session.commit()
-            
-            # 3. Migrate Users from JSON (Restore original passwords)
-            try:
-                import json
-                users_file = os.path.join(basedir, 'users.json')
-                if os.path.exists(users_file):
-                    with open(users_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        legacy_users = data.get('users', [])
-                        
-                    ADMIN_EMAILS = ["admin@mendoncagalvao.com.br", "arthur.monteiro@mendoncagalvao.com.br"]
-                    
-                    for u_data in legacy_users:
-                        email = u_data['email']
-                        existing = User.query.filter_by(email=email).first()
-                        
-                        target_role = 'admin' if email in ADMIN_EMAILS else 'user'
-                        
-                        if not existing:
-                            print(f"Migrating user: {email}")
-                            new_u = User(
-                                email=email,
-                                name=u_data['name'],
-                                password_hash=u_data.get('password_hash', ''), # KEEP ORIGINAL HASH
-                                role=target_role,
-                                is_active=True,
-                                created_at=datetime.utcnow()
-                            )
-                            db.session.add(new_u)
-                            
-                            # Grant access to all systems for legacy users
-                            systems = System.query.all()
-                            for s in systems:
-                                db.session.add(UserSystemAccess(user_id=new_u.id, system_id=s.id))
-                        else:
-                            # Update role if needed
-                            if existing.role != target_role and target_role == 'admin':
-                                existing.role = 'admin'
-                                db.session.add(existing)
+        migrations.upgrade()
+    except Exception as e:
+        print(f"Error during database migration: {e}")
+# ------------------------
 
-                    db.session.commit()
-                else:
-                    print("users.json not found inside app context.")
-            except Exception as e:
-                print(f"Error migrating users in app.py: {e}")
 
-                 
-            print("Production Initialization Complete.")
-    except Exception as e:
-        print(f"Error during production auto-init: {e}")
-# ----------------------------------------
+def remember_user_snapshot(user, catalog=None):
+    """
+    Grava na sessão o snapshot do usuário (modo SESSION_USER_SNAPSHOT).
 
+    As versões são lidas antes das permissões para que uma alteração
+    concorrente invalide o snapshot na próxima requisição.
+    """
+    user_version = versions.user_version(user.id)
+    epoch = versions.epoch()
+    catalog = catalog or get_catalog()
+    resolved_systems = user.load_permissions(catalog)
+    session[user_snapshot.SESSION_KEY] = user_snapshot.build_snapshot(
+        user, resolved_systems, catalog, user_version, epoch
+    )
 
 @login_manager.user_loader
 def load_user(user_id):
     """Carrega um usuário baseado no ID (PK)"""
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+
+    if not app.config['SESSION_USER_SNAPSHOT']:
+        return User.query.get(user_id)
+
+    # Snapshot válido: autentica sem ir ao banco
+    snapshot = session.get(user_snapshot.SESSION_KEY)
+    if snapshot and user_snapshot.is_current(snapshot, user_id):
+        return user_snapshot.SessionUser(snapshot)
+
+    # Versão mudou (ou não há snapshot): recarrega e regrava
+    catalog = get_catalog()
+    user = User.query.get(user_id)
+    if user:
+        remember_user_snapshot(user, catalog)
+    else:
+        session.pop(user_snapshot.SESSION_KEY, None)
+    return user
 
 @app.route('/')
+@query_inspector.budget(3)
 @login_required
+@conditional_dashboard
 def index():
     """
     Rota principal. Renderiza apenas sistemas permitidos.
     """
-    # Buscar todos os sistemas
-    all_systems = System.query.all()
+    # Catálogo em cache + concessões do usuário em uma única consulta
+    # (popula o cache de has_access, evitando uma consulta por sistema)
+    catalog = get_catalog()
+    resolved_systems = current_user.load_permissions(catalog)
     
     # Filtrar sistemas permitidos
-    allowed_systems = []
-    for sistema in all_systems:
+    allowed = [
+        sistema for sistema, _granted in resolved_systems
         # Se for publico OU usuário tem permissão
-        if sistema.is_public or current_user.has_access(sistema.id):
-            # Converter para dict para o template se necessário, ou usar objeto direto
-            # O template espera objeto com .titulo, .descricao, etc.
-            # O model usa .name, .description.
-            # Vou adaptar aqui para manter compatibilidade com template index.html
-            
-            # Mapeamento do Model -> Dict esperado pelo template antigo
-            sys_dict = {
-                'id': sistema.id,
-                'titulo': sistema.name,
-                'descricao': sistema.description,
-                'url': sistema.url,
-                'icone': sistema.icon_class,
-                'cta': 'Acessar', # Default CTA
-                'category': sistema.category
-            }
-            if 'portal' in sistema.id: sys_dict['cta'] = 'Acessar Portal'
-            elif 'comissao' in sistema.id: sys_dict['cta'] = 'Calcular Comissão'
-            elif 'ponto' in sistema.id: sys_dict['cta'] = 'Processar Ponto'
-            
-            allowed_systems.append(sys_dict)
-            
-    # Separar para compatibilidade com abas (index.html filtrava por ID ou lógica?)
-    # O index.html original itera sobre 'sistemas' para a aba Principal.
-    # E tinha "Placeholder" para automações.
-    # Agora vamos passar TUDO e o filtro visual deve ser feito se quisermos separar abas.
-    # O index.html usa 'sistemas' e 'automacoes' (hardcoded?).
-    # O index.html original iterava `{% for sistema in sistemas %}` na aba 'sistemas-principais'.
-    # E na aba 'automacoes' tinha placeholder.
-    
-    # Preciso atualizar index.html para iterar corretamente se eu quiser que automações apareçam na aba certa.
-    # Mas o user pediu para não quebrar UI.
-    # Vou passar 'sistemas' filtrado.
+        if sistema.is_public or current_user.has_access(sistema.id)
+    ]
+
+    # Usuários com o mesmo conjunto de sistemas compartilham o mesmo fragmento.
+    # Mudanças de permissão alteram o conjunto e mudanças no catálogo alteram
+    # a versão, então a chave já invalida o cache sozinha.
+    digest = hashlib.sha1('\x1f'.join(sorted(s.id for s in allowed)).encode()).hexdigest()
+    grid_key = (catalog.version, digest)
+    sistemas_html = systems_grid_cache.get(grid_key)
+
+    if sistemas_html is None:
+        # As abas (principal/automação) são separadas no template pela categoria
+        sistemas_html = Markup(render_template('partials/systems_grid.html', sistemas=allowed))
+        systems_grid_cache.set(grid_key, sistemas_html)
     
     # Membros da Equipe (Estático por enquanto)
     team_members = [
@@ -220,13 +223,17 @@ def index():
     
     return render_template(
         'index.html',
-        sistemas=allowed_systems,
+        sistemas_html=sistemas_html,
         team_members=team_members,
         current_user=current_user,
         ano_atual=datetime.now().year
     )
 
+HASHING_BUSY_MESSAGE = 'Muitas solicitações no momento. Tente novamente em instantes.'
+THROTTLED_MESSAGE = 'Muitas tentativas. Aguarde alguns minutos e tente novamente.'
+
 @app.route('/login', methods=['GET', 'POST'])
+@cached_page
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('index'))
@@ -234,6 +241,11 @@ def login():
     if request.method == 'POST':
         email = request.form.get('email', '').lower().strip()
         password = request.form.get('password', '')
+
+        # Só senhas erradas contam, por IP e por conta (ver throttle.py)
+        if is_blocked(('login_ip', request.remote_addr), ('login_email', email)):
+            flash(THROTTLED_MESSAGE, 'error')
+            return render_template('login.html'), 429
         
         if not email or not password:
             flash('Por favor, preencha todos os campos.', 'error')
@@ -241,17 +253,35 @@ def login():
         
         # Auth via DB
         user = User.query.filter_by(email=email).first()
+
+        try:
+            password_ok = user is not None and bool(user.password_hash) and verify_password(user.password_hash, password)
+        except HashingBusy:
+            flash(HASHING_BUSY_MESSAGE, 'error')
+            return render_template('login.html'), 503
         
-        if user and check_password_hash(user.password_hash, password):
+        if password_ok:
             if not user.is_active:
                 flash('Conta desativada.', 'error')
                 return render_template('login.html')
                 
+            # Hash fora da política (parâmetros antigos ou caros demais):
+            # refaz com a senha que acabou de ser validada
+            if hashing.policy.needs_rehash(user.password_hash):
+                try:
+                    user.password_hash = hash_password(password)
+                    db.session.commit()
+                except HashingBusy:
+                    db.session.rollback()
+
             login_user(user)
+            if app.config['SESSION_USER_SNAPSHOT']:
+                remember_user_snapshot(user)
             
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('index'))
-            
+
+        record_failure(('login_ip', request.remote_addr), ('login_email', email))
         flash('Email ou senha incorretos.', 'error')
     
     return render_template('login.html')
@@ -266,6 +296,10 @@ def register():
         email = request.form.get('email', '').lower().strip()
         password = request.form.get('password', '')
         confirm_password = request.form.get('confirm_password', '')
+
+        if is_throttled(('register_ip', request.remote_addr)):
+            flash(THROTTLED_MESSAGE, 'error')
+            return render_template('register.html'), 429
         
         if not all([name, email, password, confirm_password]):
             flash('Por favor, preencha todos os campos.', 'error')
@@ -287,15 +321,30 @@ def register():
             flash('As senhas não coincidem.', 'error')
             return render_template('register.html')
             
-        if User.query.filter_by(email=email).first():
+        existing_user = User.query.filter_by(email=email).first()
+        # Contas pré-cadastradas pela reconciliação (roster_sync.py) não têm senha
+        if existing_user and existing_user.password_hash:
             flash('Este email já está cadastrado.', 'error')
             return redirect(url_for('login'))
             
+        try:
+            password_hash = hash_password(password)
+        except HashingBusy:
+            flash(HASHING_BUSY_MESSAGE, 'error')
+            return render_template('register.html'), 503
+
+        if existing_user:
+            existing_user.name = name
+            existing_user.password_hash = password_hash
+            db.session.commit()
+            flash('Cadastro realizado com sucesso! Faça login.', 'success')
+            return redirect(url_for('login'))
+
         # Create User
         new_user = User(
             email=email,
             name=name,
-            password_hash=generate_password_hash(password),
+            password_hash=password_hash,
             role='user', # Default role
             created_at=datetime.utcnow()
         )
@@ -321,6 +370,11 @@ def forgot_password():
         
     if request.method == 'POST':
         email = request.form.get('email').lower().strip()
+
+        if is_throttled(('forgot_ip', request.remote_addr), ('forgot_email', email)):
+            flash(THROTTLED_MESSAGE, 'error')
+            return render_template('forgot_password.html'), 429
+
         user = User.query.filter_by(email=email).first()
         
         if user:
@@ -355,7 +409,11 @@ def reset_password(token):
             
         user = User.query.filter_by(email=email).first()
         if user:
-            user.password_hash = generate_password_hash(password)
+            try:
+                user.password_hash = hash_password(password)
+            except HashingBusy:
+                flash(HASHING_BUSY_MESSAGE, 'error')
+                return render_template('reset_password.html', token=token), 503
             db.session.commit()
             flash('Senha redefinida com sucesso.', 'success')
             return redirect(url_for('login'))
@@ -370,16 +428,19 @@ def send_reset_email(user_email, token):
     msg.html = render_template('email/reset_password.html', reset_url=reset_url, year=datetime.now().year)
     if app.config.get('MAIL_SUPPRESS_SEND'):
         print(f"RESET LINK: {reset_url}")
-    mail.send(msg)
+    # Apenas enfileira; o envio SMTP acontece na thread da outbox
+    enqueue_email(msg)
 
 @app.route('/logout')
 @login_required
 def logout():
     logout_user()
+    session.pop(user_snapshot.SESSION_KEY, None)
     flash('Você saiu com sucesso.', 'info')
     return redirect(url_for('login'))
 
 @app.route('/privacidade')
+@cached_page
 def privacidade():
     return render_template('privacidade.html', data_atualizacao=datetime.now().strftime('%d/%m/%Y'), ano_atual=datetime.now().year)
 
@@ -391,12 +452,10 @@ def page_not_found(e):
 def internal_error(e):
     return render_template('index.html'), 500
 
+# Pré-compila os templates na inicialização do worker
+if os.environ.get('TEMPLATE_WARMUP', '1').lower() in ('1', 'true', 'yes'):
+    template_cache.warm_up(app)
+
 if __name__ == '__main__':
-    # Auto-init DB for dev
-    db_file = os.path.join(basedir, 'portal_mg.db')
-    if not os.path.exists(db_file):
-        print("Inicializando Banco de Dados...")
-        from init_db import init_db
-        init_db()
-        
+    query_inspector.init_app(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,139 @@
+"""
+Pipeline de Arquivos Estáticos
+==============================
+
+Etapa de build que copia os arquivos de `static/` para `static/dist/` com o
+hash do conteúdo no nome (ex.: `css/styles.3f2a9c1b7d4e.css`), grava uma
+versão `.gz` ao lado dos arquivos de texto e um `manifest.json` com o mapa
+nome original -> nome com hash.
+
+Em tempo de execução, `init_app` substitui o `url_for` dos templates: se o
+arquivo pedido via `url_for('static', filename=...)` está no manifesto, a
+URL aponta para `/assets/<nome com hash>`, servida com
+`Cache-Control: immutable` de um ano (e a versão `.gz` quando o navegador
+aceita). Como o nome muda junto com o conteúdo, visitas seguintes não fazem
+nenhuma requisição de assets. Sem manifesto (desenvolvimento), nada muda.
+
+Uso:
+    python assets.py build
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import sys
+
+from flask import abort, request, send_from_directory, url_for
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_FILE = os.path.join(DIST_DIR, 'manifest.json')
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+HASH_LENGTH = 12
+ONE_YEAR = 365 * 24 * 3600
+
+
+def hashed_name(relpath, content):
+    stem, ext = os.path.splitext(relpath)
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    return f"{stem}.{digest}{ext}"
+
+
+def build(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """
+    Gera `dist_dir` a partir de `static_dir` (recriado do zero).
+
+    Returns:
+        dict: manifesto {caminho original: caminho com hash}
+    """
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        # Não reprocessa a própria saída
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            relpath = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                content = f.read()
+
+            target_rel = hashed_name(relpath, content)
+            target = os.path.join(dist_dir, target_rel)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(content)
+
+            if relpath.lower().endswith(COMPRESSIBLE):
+                # mtime=0: mesma entrada, mesmo .gz (builds reproduzíveis)
+                compressed = gzip.compress(content, compresslevel=9, mtime=0)
+                if len(compressed) < len(content):
+                    with open(target + '.gz', 'wb') as f:
+                        f.write(compressed)
+
+            manifest[relpath] = target_rel
+
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(path=MANIFEST_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def init_app(app):
+    """Registra a rota /assets e o `url_for` com nomes versionados nos templates."""
+    manifest = load_manifest()
+    served = frozenset(manifest.values())
+    app.extensions['assets_manifest'] = manifest
+
+    @app.route('/assets/<path:filename>')
+    def assets(filename):
+        if filename not in served:
+            abort(404)
+
+        gz_path = os.path.join(DIST_DIR, filename + '.gz')
+        if 'gzip' in request.accept_encodings and os.path.exists(gz_path):
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(DIST_DIR, filename + '.gz', mimetype=mimetype, max_age=ONE_YEAR)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = send_from_directory(DIST_DIR, filename, max_age=ONE_YEAR)
+
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    def asset_url_for(endpoint, **values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+            return url_for('assets', **values)
+        return url_for(endpoint, **values)
+
+    if manifest:
+        app.jinja_env.globals['url_for'] = asset_url_for
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'build':
+        print("Uso: python assets.py build")
+        sys.exit(1)
+
+    result = build()
+    compressed = sum(1 for name in result.values() if os.path.exists(os.path.join(DIST_DIR, name + '.gz')))
+    print(f"{len(result)} arquivos versionados em {os.path.relpath(DIST_DIR, BASE_DIR)} ({compressed} com .gz).")
@@ -0,0 +1,176 @@
+"""
+Gravação da Trilha de Auditoria
+===============================
+
+Write-behind para a tabela `audit_logs`: as views apenas enfileiram os
+registros e, após o commit da transação que os gerou, eles vão para um
+buffer em memória gravado em lote (um INSERT executemany) quando atinge
+AUDIT_BATCH_SIZE ou a cada AUDIT_FLUSH_SECONDS. Registros de transações
+desfeitas (rollback) são descartados. O buffer também é esvaziado no
+encerramento do processo.
+
+Configuração (variáveis de ambiente):
+    AUDIT_WRITE_BEHIND   0 grava na transação do request (comportamento antigo)
+    AUDIT_BATCH_SIZE     Registros por lote (padrão 200)
+    AUDIT_FLUSH_SECONDS  Intervalo máximo até a gravação (padrão 2)
+    AUDIT_CONSOLIDATE    0 grava um registro por sistema concedido/revogado
+                         em vez de um único UPDATE_ACCESS por edição
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import atexit
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, AuditLog
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+
+class AuditWriter:
+    """Buffer de registros de auditoria com gravação em lote."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.write_behind = _env_flag('AUDIT_WRITE_BEHIND', '1')
+        self.consolidate = _env_flag('AUDIT_CONSOLIDATE', '1')
+        self.batch_size = int(os.environ.get('AUDIT_BATCH_SIZE', 200))
+        self.flush_seconds = float(os.environ.get('AUDIT_FLUSH_SECONDS', 2))
+        self._buffer = deque()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread_pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        atexit.register(self.flush)
+
+    def _ensure_thread(self):
+        if self._thread_pid == os.getpid():
+            return
+        self._thread_pid = os.getpid()
+        threading.Thread(target=self._run, name='audit-writer', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"ERRO ao gravar auditoria: {e}")
+
+    def log(self, action, actor_id=None, target_id=None, meta_info=None):
+        """Registra um evento de auditoria."""
+        self.log_many([{
+            'actor_id': actor_id,
+            'target_id': target_id,
+            'action': action,
+            'meta_info': meta_info,
+        }])
+
+    def log_many(self, entries):
+        """
+        Registra vários eventos de uma vez.
+
+        Args:
+            entries (list): Dicts com 'action', 'actor_id', 'target_id', 'meta_info'
+        """
+        now = datetime.utcnow()
+        rows = [dict(entry, created_at=entry.get('created_at') or now) for entry in entries]
+        if not rows:
+            return
+
+        if not self.write_behind:
+            # Mesmo comportamento de antes: entra no commit do request
+            db.session.add_all(AuditLog(**row) for row in rows)
+            return
+
+        # Só vai para o buffer depois do commit (ver _publish_audit_rows)
+        db.session.info.setdefault('pending_audit', []).extend(rows)
+
+    def enqueue(self, rows):
+        """Adiciona registros já confirmados ao buffer de gravação."""
+        self._buffer.extend(rows)
+        self._ensure_thread()
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Grava tudo o que estiver no buffer, em lotes de `batch_size`.
+
+        Em caso de erro os registros voltam para o início do buffer e são
+        tentados novamente no próximo flush.
+        """
+        if not self._buffer:
+            return 0
+
+        written = 0
+        with self._flush_lock:
+            while self._buffer:
+                rows = []
+                while self._buffer and len(rows) < self.batch_size:
+                    rows.append(self._buffer.popleft())
+                try:
+                    with self.app.app_context():
+                        with db.engine.begin() as conn:
+                            conn.execute(AuditLog.__table__.insert(), rows)
+                except Exception:
+                    self._buffer.extendleft(reversed(rows))
+                    raise
+                written += len(rows)
+        return written
+
+
+audit_writer = AuditWriter()
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_audit_rows(session):
+    rows = session.info.pop('pending_audit', None)
+    if rows:
+        audit_writer.enqueue(rows)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_audit_rows(session):
+    session.info.pop('pending_audit', None)
+
+
+def log_access_change(actor_id, user_id, added, removed):
+    """
+    Registra a alteração de acessos de um usuário.
+
+    Consolidado (padrão): um único UPDATE_ACCESS com as listas de sistemas
+    adicionados e removidos. Caso contrário, um GRANT_ACCESS/REVOKE_ACCESS
+    por sistema, como no formato original.
+    """
+    target_id = f"User:{user_id}"
+    added, removed = sorted(added), sorted(removed)
+    if not added and not removed:
+        return
+
+    if audit_writer.consolidate:
+        audit_writer.log(
+            'UPDATE_ACCESS', actor_id=actor_id, target_id=target_id,
+            meta_info={'added': added, 'removed': removed}
+        )
+        return
+
+    audit_writer.log_many(
+        [{'action': 'GRANT_ACCESS', 'actor_id': actor_id, 'target_id': target_id,
+          'meta_info': {'system': sys_id}} for sys_id in added]
+        + [{'action': 'REVOKE_ACCESS', 'actor_id': actor_id, 'target_id': target_id,
+            'meta_info': {'system': sys_id}} for sys_id in removed]
+    )
@@ -0,0 +1,252 @@
+"""
+Consulta e Arquivamento da Auditoria
+====================================
+
+Navegação da trilha de auditoria com paginação por cursor (keyset) sobre
+(created_at, id), usando os índices compostos de `AuditLog`, e arquivamento
+dos registros antigos em segmentos JSONL compactados (gzip).
+
+Os segmentos ficam em `var/audit_archive/` junto com um manifesto
+(`segments.json`) que guarda, para cada arquivo, o intervalo de datas, a
+quantidade de registros e os atores/ações presentes, para que a busca pule
+segmentos que não podem conter resultados. `search_audit` percorre primeiro
+o banco e, esgotados os registros vivos, continua nos segmentos, então a
+mesma consulta e o mesmo cursor valem para os dois.
+
+Retenção (ex.: cron diário):
+    python audit_archive.py archive --days 180
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import base64
+import gzip
+import json
+import os
+import sys
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from models import db, AuditLog
+from runtime import runtime_path, file_lock
+
+ARCHIVE_DIR = os.path.dirname(runtime_path('audit_archive', 'segments.json'))
+MANIFEST_FILE = os.path.join(ARCHIVE_DIR, 'segments.json')
+SEGMENT_ROWS = 50000
+
+AuditEntry = namedtuple('AuditEntry', 'id created_at actor_id target_id action meta_info archived')
+
+
+# --- Cursor ---
+
+def encode_cursor(entry):
+    raw = f"{entry.created_at.isoformat()}|{entry.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Retorna (created_at, id) ou None se o cursor for inválido."""
+    try:
+        created_at, entry_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(entry_id)
+    except (ValueError, UnicodeDecodeError, AttributeError):
+        return None
+
+
+# --- Manifesto dos segmentos ---
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def _save_manifest(segments):
+    tmp = MANIFEST_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(segments, f, indent=2)
+    os.replace(tmp, MANIFEST_FILE)
+
+
+# --- Busca ---
+
+def _live_entries(filters, after, limit):
+    query = AuditLog.query
+    if filters.get('actor_id') is not None:
+        query = query.filter(AuditLog.actor_id == filters['actor_id'])
+    if filters.get('target_id'):
+        query = query.filter(AuditLog.target_id == filters['target_id'])
+    if filters.get('action'):
+        query = query.filter(AuditLog.action == filters['action'])
+    if after is not None:
+        query = query.filter(db.tuple_(AuditLog.created_at, AuditLog.id) < after)
+
+    rows = query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit).all()
+    return [
+        AuditEntry(r.id, r.created_at, r.actor_id, r.target_id, r.action, r.meta_info, False)
+        for r in rows
+    ]
+
+
+def _segment_may_match(segment, filters, after):
+    if after is not None and datetime.fromisoformat(segment['min_created_at']) > after[0]:
+        return False
+    if filters.get('actor_id') is not None and filters['actor_id'] not in segment['actors']:
+        return False
+    if filters.get('action') and filters['action'] not in segment['actions']:
+        return False
+    return True
+
+
+def _archived_entries(filters, after, limit):
+    found = []
+    segments = sorted(load_manifest(), key=lambda s: s['max_created_at'], reverse=True)
+
+    for segment in segments:
+        if len(found) >= limit:
+            break
+        if not _segment_may_match(segment, filters, after):
+            continue
+
+        matches = []
+        with gzip.open(os.path.join(ARCHIVE_DIR, segment['file']), 'rt', encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                if filters.get('actor_id') is not None and row['actor_id'] != filters['actor_id']:
+                    continue
+                if filters.get('target_id') and row['target_id'] != filters['target_id']:
+                    continue
+                if filters.get('action') and row['action'] != filters['action']:
+                    continue
+                created_at = datetime.fromisoformat(row['created_at'])
+                if after is not None and (created_at, row['id']) >= after:
+                    continue
+                matches.append(AuditEntry(
+                    row['id'], created_at, row['actor_id'], row['target_id'],
+                    row['action'], row['meta_info'], True
+                ))
+
+        matches.sort(key=lambda e: (e.created_at, e.id), reverse=True)
+        found.extend(matches[:limit - len(found)])
+
+    return found
+
+
+def search_audit(actor_id=None, target_id=None, action=None, cursor=None, limit=50):
+    """
+    Lista registros de auditoria do mais recente para o mais antigo.
+
+    Deve ser chamado dentro de um app context.
+
+    Args:
+        actor_id (int): Filtra por quem executou a ação
+        target_id (str): Filtra pelo alvo (ex.: 'User:12')
+        action (str): Filtra pela ação (ex.: 'UPDATE_ACCESS')
+        cursor (str): Cursor devolvido pela página anterior
+        limit (int): Tamanho da página
+
+    Returns:
+        tuple: (lista de AuditEntry, cursor da próxima página ou None)
+    """
+    filters = {'actor_id': actor_id, 'target_id': target_id, 'action': action}
+    after = decode_cursor(cursor) if cursor else None
+
+    # Um registro a mais indica se existe próxima página
+    entries = _live_entries(filters, after, limit + 1)
+    if len(entries) <= limit:
+        archive_after = (entries[-1].created_at, entries[-1].id) if entries else after
+        entries += _archived_entries(filters, archive_after, limit + 1 - len(entries))
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    next_cursor = encode_cursor(entries[-1]) if has_more and entries else None
+    return entries, next_cursor
+
+
+# --- Arquivamento ---
+
+def _serialize(row):
+    return json.dumps({
+        'id': row.id,
+        'created_at': row.created_at.isoformat(),
+        'actor_id': row.actor_id,
+        'target_id': row.target_id,
+        'action': row.action,
+        'meta_info': row.meta_info,
+    }, ensure_ascii=False)
+
+
+def archive_old_entries(older_than_days=180, segment_rows=SEGMENT_ROWS):
+    """
+    Move registros mais antigos que `older_than_days` para segmentos gzip.
+
+    Cada segmento é gravado e registrado no manifesto antes de os registros
+    serem apagados do banco; uma falha no meio do caminho deixa no máximo
+    registros duplicados (banco + arquivo), nunca perdidos.
+
+    Deve ser chamado dentro de um app context.
+
+    Returns:
+        int: Quantidade de registros arquivados
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archived = 0
+
+    with file_lock('audit-archive.lock'):
+        segments = load_manifest()
+        while True:
+            rows = AuditLog.query.filter(AuditLog.created_at < cutoff).order_by(
+                AuditLog.created_at, AuditLog.id
+            ).limit(segment_rows).all()
+            if not rows:
+                break
+
+            first, last = rows[0], rows[-1]
+            name = f"audit-{first.created_at:%Y%m%dT%H%M%S}-{last.created_at:%Y%m%dT%H%M%S}-{last.id}.jsonl.gz"
+            path = os.path.join(ARCHIVE_DIR, name)
+            with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(_serialize(row) + '\n')
+            os.replace(path + '.tmp', path)
+
+            segments.append({
+                'file': name,
+                'min_created_at': first.created_at.isoformat(),
+                'max_created_at': last.created_at.isoformat(),
+                'count': len(rows),
+                'actors': sorted({r.actor_id for r in rows if r.actor_id is not None}),
+                'actions': sorted({r.action for r in rows}),
+            })
+            _save_manifest(segments)
+
+            # Tudo até (created_at, id) do último registro já está no segmento
+            AuditLog.query.filter(
+                AuditLog.created_at < cutoff,
+                db.tuple_(AuditLog.created_at, AuditLog.id) <= (last.created_at, last.id)
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            db.session.expunge_all()
+
+            archived += len(rows)
+            print(f"Segmento {name}: {len(rows)} registros")
+
+    return archived
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'archive':
+        print("Uso: python audit_archive.py archive [--days 180]")
+        sys.exit(1)
+
+    days = 180
+    if '--days' in sys.argv:
+        days = int(sys.argv[sys.argv.index('--days') + 1])
+
+    from app import app
+
+    with app.app_context():
+        total = archive_old_entries(days)
+    print(f"Arquivamento concluído: {total} registros.")
@@ -0,0 +1,152 @@
+"""
+Benchmark de Login x Workers do Gunicorn
+========================================
+
+Mede logins por segundo (scrypt padrão do Werkzeug) com o app servido pelo
+gunicorn, variando o número de workers (-w) com um pool de hash fixo por
+worker, e várias requisições HTTP simultâneas. Mostra também as recusadas
+(503, pool saturado) e a latência p95.
+
+Uso:
+    python bench_login.py [--clients 16] [--seconds 5] [--gunicorn-workers 1,2,4] [--pool 2]
+
+Usa um banco SQLite e um diretório de runtime temporários.
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import argparse
+import http.client
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+EMAIL = 'bench.login@mendoncagalvao.com.br'
+PASSWORD = 'senha-benchmark'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _setup(env):
+    """Cria o banco (migrações) e o usuário do benchmark em um processo à parte."""
+    code = (
+        "from werkzeug.security import generate_password_hash\n"
+        "from app import app\n"
+        "from models import db, User\n"
+        "with app.app_context():\n"
+        f"    db.session.add(User(email={EMAIL!r}, name='Benchmark',"
+        f" password_hash=generate_password_hash({PASSWORD!r})))\n"
+        "    db.session.commit()\n"
+    )
+    subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def _wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/login')
+            conn.getresponse().read()
+            conn.close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def _run(gunicorn_workers, pool, clients, seconds, env):
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(gunicorn_workers), '-b', f'127.0.0.1:{port}', 'app:app'],
+        cwd=BASE_DIR, env=dict(env, PASSWORD_HASH_WORKERS=str(pool)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not _wait_ready(port):
+            raise RuntimeError('gunicorn não respondeu a tempo')
+
+        body = urlencode({'email': EMAIL, 'password': PASSWORD})
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        done, busy, latencies = [], [], []
+        deadline = time.monotonic() + seconds
+
+        def client():
+            ok = rejected = 0
+            samples = []
+            while time.monotonic() < deadline:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                started = time.perf_counter()
+                conn.request('POST', '/login', body=body, headers=headers)
+                status = conn.getresponse().status
+                samples.append(time.perf_counter() - started)
+                conn.close()
+                if status == 302:
+                    ok += 1
+                elif status == 503:
+                    rejected += 1
+            done.append(ok)
+            busy.append(rejected)
+            latencies.extend(samples)
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0
+    return sum(done) / elapsed, sum(busy), p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--gunicorn-workers', default='1,2,4')
+    parser.add_argument('--pool', type=int, default=int(os.environ.get('PASSWORD_HASH_WORKERS', 2)),
+                        help='processos do pool de hash por worker (0 = no próprio worker)')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench-login-')
+    env = dict(
+        os.environ,
+        DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'),
+        PORTAL_RUNTIME_DIR=tmp,
+        THROTTLE_ENABLED='0',
+        OUTBOX_WORKER='0',
+        TEMPLATE_WARMUP='0',
+    )
+    try:
+        _setup(dict(env, PASSWORD_HASH_WORKERS='0'))
+
+        print(f"pool de hash por worker: {args.pool}, {args.clients} clientes")
+        print(f"{'workers':>8} {'logins/s':>10} {'recusados':>10} {'p95 ms':>8}")
+        for workers in [int(w) for w in args.gunicorn_workers.split(',')]:
+            rate, rejected, p95 = _run(workers, args.pool, args.clients, args.seconds, env)
+            print(f"{workers:>8} {rate:>10.1f} {rejected:>10} {p95:>8.0f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
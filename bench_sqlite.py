@@ -0,0 +1,134 @@
+"""
+Benchmark de Concorrência do SQLite
+===================================
+
+Compara o perfil `default` com o `tuned` (ver sqlite_profile.py) simulando
+vários workers do gunicorn: cada processo alterna leituras (usuário por
+email, últimas entradas da auditoria) com transações curtas de escrita
+(registro de auditoria e cadastro de usuário).
+
+Uso:
+    python bench_sqlite.py [--processes 8] [--seconds 5] [--write-ratio 0.3]
+
+Usa bancos SQLite temporários (um por perfil).
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import sqlite_profile
+from models import db
+
+SEED_USERS = 2000
+
+
+def _setup(url):
+    engine = sqlite_profile.make_engine(url, 'default')
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO users (email, name, password_hash, role, is_active, created_at) "
+                 "VALUES (:email, :name, '', 'user', 1, :now)"),
+            [{'email': f'seed{i}@mendoncagalvao.com.br', 'name': f'Seed {i}', 'now': datetime.utcnow()}
+             for i in range(SEED_USERS)]
+        )
+    engine.dispose()
+
+
+def _worker(url, profile, seconds, write_ratio, worker_id, results):
+    engine = sqlite_profile.make_engine(url, profile)
+    rng = random.Random(worker_id)
+    reads = writes = errors = 0
+    latencies = []
+    seq = 0
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                seq += 1
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO users (email, name, password_hash, role, is_active, created_at) "
+                             "VALUES (:email, 'Bench', '', 'user', 1, :now)"),
+                        {'email': f'w{worker_id}-{seq}@mendoncagalvao.com.br', 'now': datetime.utcnow()}
+                    )
+                    conn.execute(
+                        text("INSERT INTO audit_logs (actor_id, action, target_id, created_at) "
+                             "VALUES (NULL, 'REGISTER', :target, :now)"),
+                        {'target': f'w{worker_id}-{seq}', 'now': datetime.utcnow()}
+                    )
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT id, name FROM users WHERE email = :email"),
+                        {'email': f'seed{rng.randrange(SEED_USERS)}@mendoncagalvao.com.br'}
+                    ).first()
+                    conn.execute(
+                        text("SELECT id, action FROM audit_logs ORDER BY created_at DESC LIMIT 10")
+                    ).all()
+                reads += 1
+            latencies.append(time.perf_counter() - started)
+        except OperationalError:
+            # "database is locked"
+            errors += 1
+
+    engine.dispose()
+    results.put((reads, writes, errors, latencies))
+
+
+def _run(profile, processes, seconds, write_ratio):
+    tmp = tempfile.mkdtemp(prefix=f'bench-sqlite-{profile}-')
+    url = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+    _setup(url)
+
+    ctx = multiprocessing.get_context('fork')
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=_worker, args=(url, profile, seconds, write_ratio, i, results))
+        for i in range(processes)
+    ]
+    for p in workers:
+        p.start()
+    collected = [results.get() for _ in workers]
+    for p in workers:
+        p.join()
+
+    reads = sum(r[0] for r in collected)
+    writes = sum(r[1] for r in collected)
+    errors = sum(r[2] for r in collected)
+    latencies = sorted(lat for r in collected for lat in r[3])
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0
+    return reads, writes, errors, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de concorrência do SQLite')
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.3)
+    args = parser.parse_args()
+
+    print(f"{args.processes} processos, {args.seconds:.0f}s, {args.write_ratio:.0%} escritas")
+    print(f"{'perfil':>8} | {'leituras/s':>10} | {'escritas/s':>10} | {'bloqueios':>9} | {'p99 (ms)':>8}")
+    for profile in ('default', 'tuned'):
+        reads, writes, errors, p99 = _run(profile, args.processes, args.seconds, args.write_ratio)
+        print(f"{profile:>8} | {reads / args.seconds:>10.0f} | {writes / args.seconds:>10.0f} | "
+              f"{errors:>9} | {p99:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
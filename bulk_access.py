@@ -0,0 +1,151 @@
+"""
+Concessão e Revogação de Acesso em Massa
+========================================
+
+Aplica a concessão ou a revogação de um sistema para um conjunto de
+usuários com instruções set-based (INSERT ... SELECT / DELETE ... IN (SELECT)) em
+uma única transação, em vez de editar usuário por usuário.
+
+O conjunto de usuários é definido por um seletor que combina (AND) os
+critérios informados: IDs explícitos, termo de busca (nome/email), perfil
+(role) e/ou uma lista de emails (ex.: colada de um CSV).
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import re
+from datetime import datetime
+
+from sqlalchemy import insert, literal, select
+
+from audit import audit_writer
+from catalog import get_catalog
+from models import db, User, UserSystemAccess, mark_user_changed
+from user_search import matching_user_ids
+
+OPERATIONS = ('grant', 'revoke')
+ROLES = ('user', 'manager', 'admin')
+
+_EMAIL_RE = re.compile(r'[^\s,;"\']+@[^\s,;"\']+')
+
+
+class BulkAccessError(ValueError):
+    """Parâmetros inválidos para a operação em massa."""
+
+
+def parse_email_list(raw):
+    """Extrai emails (normalizados) de um texto livre ou conteúdo CSV."""
+    return sorted({email.lower().strip() for email in _EMAIL_RE.findall(raw or '')})
+
+
+def build_user_selector(user_ids=None, search=None, role=None, emails=None, exclude_admins=False):
+    """
+    Monta o SELECT de IDs de usuários a partir dos critérios informados.
+
+    Raises:
+        BulkAccessError: Se nenhum critério for informado ou um ID/perfil for inválido
+    """
+    selector = select(User.id)
+    has_criteria = False
+
+    if user_ids:
+        ids = []
+        for uid in user_ids:
+            try:
+                ids.append(int(uid))
+            except (TypeError, ValueError):
+                raise BulkAccessError(f'ID de usuário inválido: {uid}') from None
+        selector = selector.where(User.id.in_(ids))
+        has_criteria = True
+    if search:
+        selector = selector.where(User.id.in_(matching_user_ids(search).scalar_subquery()))
+        has_criteria = True
+    if role:
+        if role not in ROLES:
+            raise BulkAccessError(f'Perfil inválido: {role}')
+        selector = selector.where(User.role == role)
+        has_criteria = True
+    if emails:
+        selector = selector.where(User.email.in_(emails))
+        has_criteria = True
+
+    if not has_criteria:
+        raise BulkAccessError('Informe ao menos um critério de seleção de usuários.')
+
+    if exclude_admins:
+        selector = selector.where(User.role != 'admin')
+    return selector
+
+
+def apply_bulk_access(system_id, operation, selector, actor_id, dry_run=False):
+    """
+    Concede ou revoga um sistema para todos os usuários do seletor.
+
+    Args:
+        system_id (str): ID do sistema
+        operation (str): 'grant' ou 'revoke'
+        selector (Select): Resultado de `build_user_selector`
+        actor_id (int): Quem executa (gravado em granted_by e na auditoria)
+        dry_run (bool): Apenas calcula os usuários afetados
+
+    Returns:
+        list: IDs dos usuários efetivamente alterados
+
+    Raises:
+        BulkAccessError: Se o sistema ou a operação forem inválidos
+    """
+    if operation not in OPERATIONS:
+        raise BulkAccessError(f'Operação inválida: {operation}')
+    if system_id not in get_catalog().by_id:
+        raise BulkAccessError(f'Sistema inexistente: {system_id}')
+
+    selected = selector.scalar_subquery()
+    granted = select(UserSystemAccess.user_id).where(
+        UserSystemAccess.system_id == system_id
+    ).scalar_subquery()
+
+    if operation == 'grant':
+        affected_filter = db.and_(User.id.in_(selected), User.id.not_in(granted))
+    else:
+        affected_filter = db.and_(User.id.in_(selected), User.id.in_(granted))
+
+    affected_ids = [uid for (uid,) in db.session.execute(select(User.id).where(affected_filter))]
+    if dry_run or not affected_ids:
+        return affected_ids
+
+    if operation == 'grant':
+        now = datetime.utcnow()
+        db.session.execute(
+            insert(UserSystemAccess).from_select(
+                ['user_id', 'system_id', 'granted_by', 'granted_at'],
+                select(User.id, literal(system_id), literal(actor_id), literal(now)).where(affected_filter)
+            )
+        )
+    else:
+        db.session.execute(
+            UserSystemAccess.__table__.delete().where(
+                UserSystemAccess.system_id == system_id,
+                UserSystemAccess.user_id.in_(select(User.id).where(affected_filter))
+            )
+        )
+
+    # Instruções em massa não passam pelo flush do ORM
+    for uid in affected_ids:
+        mark_user_changed(uid)
+
+    action = 'GRANT_ACCESS' if operation == 'grant' else 'REVOKE_ACCESS'
+    if audit_writer.consolidate:
+        audit_writer.log(
+            f'BULK_{action}', actor_id=actor_id, target_id=f"System:{system_id}",
+            meta_info={'users': affected_ids, 'count': len(affected_ids)}
+        )
+    else:
+        audit_writer.log_many([
+            {'action': action, 'actor_id': actor_id, 'target_id': f"User:{uid}",
+             'meta_info': {'system': system_id, 'bulk': True}}
+            for uid in affected_ids
+        ])
+
+    db.session.commit()
+    return affected_ids
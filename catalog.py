@@ -0,0 +1,118 @@
+"""
+Cache do Catálogo de Sistemas
+=============================
+
+Mantém em memória um retrato imutável da tabela `systems`, já agrupado por
+categoria e com os rótulos de CTA calculados. O retrato só é recarregado
+quando a versão do catálogo (ver `versions.py`) muda, o que acontece após o
+commit de qualquer alteração em `System`.
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import threading
+from dataclasses import dataclass
+
+import versions
+from models import System
+
+
+def _cta_for(system_id):
+    """Texto do botão do card, derivado do ID do sistema."""
+    if 'portal' in system_id:
+        return 'Acessar Portal'
+    if 'comissao' in system_id:
+        return 'Calcular Comissão'
+    if 'ponto' in system_id:
+        return 'Processar Ponto'
+    return 'Acessar'
+
+
+@dataclass(frozen=True, slots=True)
+class SystemRecord:
+    """Registro imutável de um sistema do catálogo"""
+    id: str
+    name: str
+    description: str
+    category: str
+    url: str
+    icon_class: str
+    is_public: bool
+    cta: str
+
+    # Nomes esperados pelo template index.html
+    @property
+    def titulo(self):
+        return self.name
+
+    @property
+    def descricao(self):
+        return self.description
+
+    @property
+    def icone(self):
+        return self.icon_class
+
+    @classmethod
+    def from_model(cls, system):
+        return cls(
+            id=system.id,
+            name=system.name,
+            description=system.description,
+            category=system.category,
+            url=system.url,
+            icon_class=system.icon_class,
+            is_public=bool(system.is_public),
+            cta=_cta_for(system.id),
+        )
+
+
+class Catalog:
+    """Retrato do catálogo em uma determinada versão"""
+
+    __slots__ = ('version', 'systems', 'by_id', 'by_category', 'public_ids')
+
+    def __init__(self, version, systems):
+        self.version = version
+        self.systems = tuple(systems)
+        self.by_id = {s.id: s for s in self.systems}
+        self.public_ids = frozenset(s.id for s in self.systems if s.is_public)
+
+        by_category = {}
+        for s in self.systems:
+            by_category.setdefault(s.category or 'Outros', []).append(s)
+        self.by_category = {cat: tuple(items) for cat, items in by_category.items()}
+
+    def __len__(self):
+        return len(self.systems)
+
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def get_catalog():
+    """
+    Retorna o catálogo atual, recarregando do banco se a versão mudou.
+
+    Deve ser chamado dentro de um app context.
+
+    Returns:
+        Catalog: Retrato imutável do catálogo
+    """
+    global _catalog
+
+    version = versions.catalog_version()
+    current = _catalog
+    if current is not None and current.version == version:
+        return current
+
+    with _lock:
+        if _catalog is not None and _catalog.version == version:
+            return _catalog
+        # A versão é lida antes da consulta: uma alteração concorrente gera
+        # uma versão maior e força nova carga na próxima chamada
+        records = [SystemRecord.from_model(s) for s in System.query.all()]
+        _catalog = Catalog(version, records)
+        return _catalog
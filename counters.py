@@ -0,0 +1,192 @@
+"""
+Contadores do Painel
+====================
+
+Mantém em `dashboard_counters` (linha única, id = 1) os totais exibidos no
+painel admin: usuários, usuários ativos e sistemas. Os valores são
+atualizados por triggers do SQLite a cada INSERT/DELETE em `users` e
+`systems` e a cada mudança de `users.is_active`, inclusive em operações em
+massa e SQL direto; o painel lê tudo em uma busca por chave primária em vez
+de três COUNT(*).
+
+Em bancos que não são SQLite os triggers não são criados e o painel volta
+às contagens diretas.
+
+Uso (reconciliação):
+    python counters.py reconcile
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+
+from models import db, DashboardCounters, System, User
+
+COUNTERS_ID = 1
+
+_ACTIVE = "CASE WHEN {row}.is_active THEN 1 ELSE 0 END"
+
+TRIGGERS = {
+    'dashboard_counters_users_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS dashboard_counters_users_ai AFTER INSERT ON users BEGIN
+            UPDATE dashboard_counters
+               SET users_count = users_count + 1,
+                   active_users = active_users + {_ACTIVE.format(row='new')}
+             WHERE id = {COUNTERS_ID};
+        END""",
+    'dashboard_counters_users_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS dashboard_counters_users_ad AFTER DELETE ON users BEGIN
+            UPDATE dashboard_counters
+               SET users_count = users_count - 1,
+                   active_users = active_users - {_ACTIVE.format(row='old')}
+             WHERE id = {COUNTERS_ID};
+        END""",
+    'dashboard_counters_users_au': f"""
+        CREATE TRIGGER IF NOT EXISTS dashboard_counters_users_au AFTER UPDATE OF is_active ON users BEGIN
+            UPDATE dashboard_counters
+               SET active_users = active_users + {_ACTIVE.format(row='new')} - {_ACTIVE.format(row='old')}
+             WHERE id = {COUNTERS_ID};
+        END""",
+    'dashboard_counters_systems_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS dashboard_counters_systems_ai AFTER INSERT ON systems BEGIN
+            UPDATE dashboard_counters SET systems_count = systems_count + 1 WHERE id = {COUNTERS_ID};
+        END""",
+    'dashboard_counters_systems_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS dashboard_counters_systems_ad AFTER DELETE ON systems BEGIN
+            UPDATE dashboard_counters SET systems_count = systems_count - 1 WHERE id = {COUNTERS_ID};
+        END""",
+}
+
+FIELDS = ('users_count', 'active_users', 'systems_count')
+
+_triggers_available = None
+
+
+def _count_all(conn):
+    """Contagens completas (o que os triggers devem espelhar)."""
+    return {
+        'users_count': conn.execute(text("SELECT COUNT(*) FROM users")).scalar(),
+        'active_users': conn.execute(text("SELECT COUNT(*) FROM users WHERE is_active")).scalar(),
+        'systems_count': conn.execute(text("SELECT COUNT(*) FROM systems")).scalar(),
+    }
+
+
+def _store(conn, values):
+    conn.execute(
+        text(
+            "INSERT OR REPLACE INTO dashboard_counters "
+            "(id, users_count, active_users, systems_count, reconciled_at) "
+            "VALUES (:id, :users_count, :active_users, :systems_count, :now)"
+        ),
+        {'id': COUNTERS_ID, 'now': datetime.utcnow(), **values}
+    )
+
+
+def ensure_dashboard_counters(engine):
+    """
+    Cria os triggers e a linha de contadores, se ainda não existirem.
+
+    A contagem inicial é feita na mesma transação que cria os triggers, de
+    modo que nenhuma escrita concorrente fique de fora.
+
+    Returns:
+        bool: True se os contadores materializados estão disponíveis
+    """
+    global _triggers_available
+    if engine.dialect.name != 'sqlite':
+        _triggers_available = False
+        return False
+
+    with engine.begin() as conn:
+        existing = {
+            row[0] for row in conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'dashboard_counters_%'")
+            )
+        }
+        has_row = conn.execute(
+            text("SELECT 1 FROM dashboard_counters WHERE id = :id"), {'id': COUNTERS_ID}
+        ).first()
+        if existing != set(TRIGGERS) or not has_row:
+            for name, statement in TRIGGERS.items():
+                conn.execute(text(statement))
+            _store(conn, _count_all(conn))
+
+    _triggers_available = True
+    return True
+
+
+def _counters_ready():
+    global _triggers_available
+    if _triggers_available is None:
+        if db.engine.dialect.name != 'sqlite':
+            _triggers_available = False
+        else:
+            _triggers_available = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'dashboard_counters_users_ai'")
+            ).first() is not None
+    return _triggers_available
+
+
+def get_dashboard_counters():
+    """
+    Totais do painel admin. Deve ser chamado dentro de um app context.
+
+    Returns:
+        dict: users_count, active_users, systems_count
+    """
+    if _counters_ready():
+        row = db.session.get(DashboardCounters, COUNTERS_ID)
+        if row is not None:
+            return {field: getattr(row, field) for field in FIELDS}
+
+    return {
+        'users_count': User.query.count(),
+        'active_users': User.query.filter_by(is_active=True).count(),
+        'systems_count': System.query.count(),
+    }
+
+
+def reconcile_counters():
+    """
+    Recalcula os contadores do zero e corrige eventuais divergências.
+
+    Returns:
+        dict: {campo: (valor armazenado, valor real)} apenas dos divergentes
+    """
+    with db.engine.begin() as conn:
+        actual = _count_all(conn)
+        row = conn.execute(
+            text("SELECT users_count, active_users, systems_count FROM dashboard_counters WHERE id = :id"),
+            {'id': COUNTERS_ID}
+        ).first()
+        stored = dict(zip(FIELDS, row)) if row is not None else {}
+        drift = {
+            field: (stored.get(field), actual[field])
+            for field in FIELDS
+            if stored.get(field) != actual[field]
+        }
+        _store(conn, actual)
+    return drift
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'reconcile':
+        print("Uso: python counters.py reconcile")
+        sys.exit(1)
+
+    from app import app
+
+    with app.app_context():
+        drift = reconcile_counters()
+
+    if not drift:
+        print("Contadores consistentes.")
+    else:
+        for field, (stored, actual) in drift.items():
+            print(f"Divergência em {field}: armazenado={stored}, real={actual}")
+        print("Contadores corrigidos.")
+        sys.exit(2)
@@ -8,8 +8,10 @@ Autor: Núcleo Digital MG
 Data: 2025-12-12
 """
 
-import pandas as pd
+import hashlib
 import os
+import threading
+import time
 
 # Caminho para a planilha de funcionários
 EMPLOYEES_FILE = os.path.join(os.path.dirname(__file__), 'FUNCIONARIO - Copia (1).xlsx')
@@ -17,6 +19,68 @@ EMPLOYEES_FILE = os.path.join(os.path.dirname(__file__), 'FUNCIONARIO - Copia (1
 # Domínio de email válido
 VALID_EMAIL_DOMAIN = '@mendoncagalvao.com.br'
 
+# Textos que o pandas interpreta como nulos por padrão (mantidos para que o
+# leitor em streaming descarte exatamente as mesmas linhas que o read_excel)
+_NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null',
+])
+
+
+def _is_null(value):
+    return value is None or (isinstance(value, str) and value in _NA_STRINGS)
+
+
+def load_employee_records():
+    """
+    Lê a planilha de funcionários em streaming, sem pandas.
+
+    Usa o modo read-only do openpyxl e percorre apenas as colunas A e B,
+    aplicando a mesma normalização de `load_employees_dataframe()`: a primeira
+    linha é o cabeçalho, linhas com nome ou email vazios são descartadas, o
+    email é convertido para minúsculas sem espaços e apenas a primeira
+    ocorrência de cada email é mantida.
+
+    Returns:
+        list: Lista de tuplas (nome, email) na ordem da planilha
+        None: Se houver erro ao carregar a planilha
+    """
+    try:
+        # Import tardio: openpyxl só é carregado quando a planilha é lida
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(EMPLOYEES_FILE, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            rows = sheet.iter_rows(max_col=2, values_only=True)
+            next(rows, None)  # Cabeçalho
+
+            records = []
+            seen = set()
+            for row in rows:
+                nome = row[0] if len(row) > 0 else None
+                email = row[1] if len(row) > 1 else None
+                if _is_null(nome) or _is_null(email) or not isinstance(email, str):
+                    continue
+
+                email = email.lower().strip()
+                if email in seen:
+                    continue
+                seen.add(email)
+                records.append((nome, email))
+
+            return records
+        finally:
+            workbook.close()
+
+    except FileNotFoundError:
+        print(f"ERRO: Arquivo {EMPLOYEES_FILE} não encontrado.")
+        return None
+    except Exception as e:
+        print(f"ERRO ao carregar planilha: {str(e)}")
+        return None
+
 
 def load_employees_dataframe():
     """
@@ -25,37 +89,22 @@ def load_employees_dataframe():
     A planilha deve conter:
     - Coluna A: Nome dos funcionários
     - Coluna B: Email dos funcionários (com domínio completo)
+
+    O pandas só é importado aqui; as validações do portal usam
+    `load_employee_records()`, que não depende dele.
     
     Returns:
         pd.DataFrame: DataFrame com colunas 'nome' e 'email'
         None: Se houver erro ao carregar a planilha
     """
-    try:
-        # Carregar planilha Excel
-        df = pd.read_excel(
-            EMPLOYEES_FILE,
-            usecols=[0, 1],  # Colunas A e B
-            names=['nome', 'email']  # Nomear as colunas
-        )
-        
-        # Remover linhas com valores nulos
-        df = df.dropna()
-        
-        # Converter emails para lowercase para comparação case-insensitive
-        df['email'] = df['email'].str.lower().str.strip()
-        
-        # Remover duplicatas baseado no email
-        df = df.drop_duplicates(subset=['email'])
-        
-        return df
-    
-    except FileNotFoundError:
-        print(f"ERRO: Arquivo {EMPLOYEES_FILE} não encontrado.")
-        return None
-    except Exception as e:
-        print(f"ERRO ao carregar planilha: {str(e)}")
+    records = load_employee_records()
+    if records is None:
         return None
 
+    import pandas as pd
+
+    return pd.DataFrame(records, columns=['nome', 'email'])
+
 
 def is_valid_email_domain(email):
     """
@@ -74,6 +123,126 @@ def is_valid_email_domain(email):
     return email.endswith(VALID_EMAIL_DOMAIN)
 
 
+class RosterIndex:
+    """
+    Índice em memória da planilha de funcionários.
+
+    Mantém um dicionário email normalizado -> nome, construído uma única vez
+    por processo e reconstruído apenas quando a planilha muda. A mudança é
+    detectada pelo par (mtime, tamanho) do arquivo; quando ele muda, o hash do
+    conteúdo é recalculado e o índice só é refeito se o conteúdo for outro.
+
+    Os contadores `hits`, `misses` e `reloads` ficam disponíveis em `stats()`
+    para acompanhamento sob carga.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._by_email = None
+        self._stat_key = None
+        self._content_hash = None
+        self._loaded_at = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _file_digest(self):
+        digest = hashlib.sha256()
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _build(self):
+        records = load_employee_records()
+        if records is None:
+            return None
+        # load_employee_records já manteve a primeira ocorrência de cada email
+        return {email: nome for nome, email in records}
+
+    def _ensure_current(self):
+        """Retorna o índice atual, recarregando se a planilha mudou."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            print(f"ERRO: Arquivo {self.path} não encontrado.")
+            return None
+
+        stat_key = (st.st_mtime_ns, st.st_size)
+        if stat_key == self._stat_key and self._by_email is not None:
+            return self._by_email
+
+        with self._lock:
+            # Outra thread pode ter recarregado enquanto esperávamos o lock
+            if stat_key == self._stat_key and self._by_email is not None:
+                return self._by_email
+
+            content_hash = self._file_digest()
+            if content_hash == self._content_hash and self._by_email is not None:
+                # Arquivo "tocado" sem alteração de conteúdo
+                self._stat_key = stat_key
+                return self._by_email
+
+            by_email = self._build()
+            if by_email is None:
+                # Mantém o índice anterior (se houver) e tenta de novo na próxima consulta
+                return self._by_email
+
+            self._by_email = by_email
+            self._stat_key = stat_key
+            self._content_hash = content_hash
+            self._loaded_at = time.time()
+            self.reloads += 1
+            return self._by_email
+
+    def lookup(self, email):
+        """Retorna o nome do funcionário para o email, ou None."""
+        by_email = self._ensure_current()
+        if by_email is None or not email:
+            self.misses += 1
+            return None
+
+        nome = by_email.get(email.lower().strip())
+        if nome is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return nome
+
+    def records(self):
+        """Retorna todos os funcionários como lista de dicts, na ordem da planilha."""
+        by_email = self._ensure_current()
+        if by_email is None:
+            return None
+        return [{'nome': nome, 'email': email} for email, nome in by_email.items()]
+
+    def stats(self):
+        """Contadores do índice para diagnóstico."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'reloads': self.reloads,
+            'size': len(self._by_email) if self._by_email is not None else 0,
+            'loaded_at': self._loaded_at,
+            'content_hash': self._content_hash,
+        }
+
+
+# Índice compartilhado pelo processo (cada worker do gunicorn tem o seu)
+_roster_index = RosterIndex(EMPLOYEES_FILE)
+
+
+def get_roster_stats():
+    """
+    Retorna os contadores do índice de funcionários.
+
+    Returns:
+        dict: 'hits', 'misses', 'reloads', 'size', 'loaded_at' e 'content_hash'
+    """
+    return _roster_index.stats()
+
+
 def is_employee_registered(email):
     """
     Verifica se o email está registrado na base de dados de funcionários.
@@ -84,13 +253,7 @@ def is_employee_registered(email):
     Returns:
         bool: True se o email está na base de dados
     """
-    df = load_employees_dataframe()
-    
-    if df is None:
-        return False
-    
-    email = email.lower().strip()
-    return email in df['email'].values
+    return _roster_index.lookup(email) is not None
 
 
 def get_employee_info(email):
@@ -104,20 +267,14 @@ def get_employee_info(email):
         dict: Dicionário com 'nome' e 'email' do funcionário
         None: Se o funcionário não for encontrado
     """
-    df = load_employees_dataframe()
+    nome = _roster_index.lookup(email)
     
-    if df is None:
-        return None
-    
-    email = email.lower().strip()
-    employee = df[df['email'] == email]
-    
-    if employee.empty:
+    if nome is None:
         return None
     
     return {
-        'nome': employee.iloc[0]['nome'],
-        'email': employee.iloc[0]['email']
+        'nome': nome,
+        'email': email.lower().strip()
     }
 
 
@@ -129,9 +286,4 @@ def get_all_employees():
         list: Lista de dicionários com informações dos funcionários
         None: Se houver erro ao carregar
     """
-    df = load_employees_dataframe()
-    
-    if df is None:
-        return None
-    
-    return df.to_dict('records')
+    return _roster_index.records()
@@ -0,0 +1,390 @@
+"""
+Serviço de Hash de Senhas
+=========================
+
+Executa `generate_password_hash`/`check_password_hash` (scrypt) em um pool
+de processos limitado, para que rajadas de login não prendam os workers
+do gunicorn em CPU.
+
+O número de requisições aguardando o pool também é limitado: quando a fila
+está cheia, `HashingBusy` é levantada imediatamente (fail-fast) e a view
+responde pedindo nova tentativa.
+
+Um worker síncrono do gunicorn fica bloqueado enquanto espera o resultado;
+por isso o timeout padrão é curto (1 s, algumas verificações de scrypt):
+numa rajada, o worker desiste logo e responde 503 em vez de ficar preso.
+
+Os limites valem por worker do gunicorn: cada worker tem o seu pool. A
+concorrência real de hashes na máquina é (workers do gunicorn) x
+PASSWORD_HASH_WORKERS, e a de pendentes, (workers) x
+PASSWORD_HASH_MAX_PENDING; dimensione os dois pelo número de CPUs.
+
+A política de hash define o algoritmo/parâmetros usados em novos hashes.
+Ela pode ser fixa (PASSWORD_HASH_METHOD) ou calibrada para caber em um
+orçamento de latência por verificação (PASSWORD_HASH_BUDGET_MS). A
+calibração roda uma vez por máquina, no build (`python hashing.py
+calibrate`) ou na inicialização do app, e fica em `var/hash-policy.json`;
+os requests apenas leem esse resultado. Hashes fora da política são
+refeitos de forma transparente no login.
+
+Configuração (variáveis de ambiente):
+    PASSWORD_HASH_WORKERS      Processos do pool (0 = executa no próprio worker)
+    PASSWORD_HASH_MAX_PENDING  Máximo de hashes em andamento/aguardando
+    PASSWORD_HASH_TIMEOUT      Segundos máximos de espera por um resultado (padrão 1)
+    PASSWORD_HASH_METHOD       Método fixo (ex.: scrypt:32768:8:1)
+    PASSWORD_HASH_ALGORITHM    Algoritmo calibrado: scrypt (padrão) ou pbkdf2
+    PASSWORD_HASH_BUDGET_MS    Orçamento de latência para a calibração
+
+Relatório da distribuição de parâmetros na tabela `users`:
+    python hashing.py report
+
+Calibração (grava var/hash-policy.json para PASSWORD_HASH_BUDGET_MS):
+    python hashing.py calibrate
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+import metrics
+
+from runtime import runtime_path, file_lock
+
+
+class HashingBusy(Exception):
+    """O serviço de hash está saturado; a requisição deve ser recusada."""
+
+
+def _pool_context():
+    # forkserver: os processos do pool nascem de um servidor limpo, e não de
+    # um fork do worker, que já pode ter threads (audit, outbox, gthread)
+    # segurando locks. Onde não existe (Windows), usa o padrão da plataforma
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['werkzeug.security'])
+        return context
+    return multiprocessing.get_context()
+
+
+class PasswordHasher:
+    """Pool de processos limitado para operações de hash de senha."""
+
+    def __init__(self, workers=2, max_pending=8, timeout=1.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    @classmethod
+    def from_env(cls):
+        workers = int(os.environ.get('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)))
+        return cls(
+            workers=workers,
+            max_pending=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', max(workers, 1) * 4)),
+            timeout=float(os.environ.get('PASSWORD_HASH_TIMEOUT', 1.0)),
+        )
+
+    def _get_executor(self):
+        # O pool é criado sob demanda em cada worker (depois do fork do gunicorn)
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=_pool_context()
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+
+        if self.workers <= 0:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _f: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HashingBusy()
+
+    def generate(self, password, method=None):
+        """Gera o hash de uma senha fora do worker."""
+        if method is None:
+            return self._run(generate_password_hash, password)
+        return self._run(generate_password_hash, password, method)
+
+    def verify(self, pwhash, password):
+        """Verifica uma senha contra o hash fora do worker."""
+        if not pwhash:
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._pid = None
+
+
+HASH_POLICY_FILE = 'hash-policy.json'
+
+# Parâmetros candidatos na calibração, do mais barato para o mais caro
+SCRYPT_CANDIDATES = ['scrypt:16384:8:1', 'scrypt:32768:8:1', 'scrypt:65536:8:1', 'scrypt:131072:8:1']
+PBKDF2_CANDIDATES = ['pbkdf2:sha256:200000', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:1000000']
+
+
+def hash_method(pwhash):
+    """Retorna o método com parâmetros de um hash (ex.: 'scrypt:32768:8:1')."""
+    if not pwhash or '$' not in pwhash:
+        return None
+    return pwhash.split('$', 1)[0]
+
+
+def normalize_method(method):
+    """
+    Forma com parâmetros de um método do Werkzeug (ex.: 'scrypt' ->
+    'scrypt:32768:8:1'), sem calcular nenhum hash.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return 'scrypt:32768:8:1'
+    if name == 'pbkdf2' and len(args) < 2:
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+def measure_method(method, rounds=3):
+    """Tempo mediano (ms) de uma verificação com o método informado."""
+    name, *args = method.split(':')
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        if name == 'scrypt':
+            n, r, p = map(int, args)
+            hashlib.scrypt(b'calibracao', salt=b'calibracao', n=n, r=r, p=p, maxmem=132 * n * r * p)
+        else:
+            hashlib.pbkdf2_hmac(args[0], b'calibracao', b'calibracao', int(args[1]))
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+class HashPolicy:
+    """Método alvo para novos hashes e critério de rehash no login."""
+
+    def __init__(self, method=None, algorithm='scrypt', budget_ms=None):
+        self._fixed = method
+        self.algorithm = algorithm
+        self.budget_ms = budget_ms
+        self._method = None
+
+    @classmethod
+    def from_env(cls):
+        budget = os.environ.get('PASSWORD_HASH_BUDGET_MS')
+        return cls(
+            method=os.environ.get('PASSWORD_HASH_METHOD') or None,
+            algorithm=os.environ.get('PASSWORD_HASH_ALGORITHM', 'scrypt'),
+            budget_ms=float(budget) if budget else None,
+        )
+
+    @property
+    def method(self):
+        if self._method is None:
+            if self._fixed or self.budget_ms is None:
+                self.resolve()
+            else:
+                # Caminho do request: só lê a calibração feita no build/boot
+                cached = self._cached_calibration()
+                if cached is None:
+                    return normalize_method(self.algorithm)
+                self._method = cached['method']
+        return self._method
+
+    def resolve(self):
+        """
+        Define o método alvo (fixo, calibrado ou o padrão do Werkzeug).
+
+        Com orçamento, calibra se ainda não houver resultado para esta
+        máquina: chamar no boot ou no build, nunca durante um request.
+        Sem orçamento, não calcula nenhum hash.
+        """
+        if self._fixed:
+            self._method = normalize_method(self._fixed)
+        elif self.budget_ms is None:
+            self._method = normalize_method('scrypt')
+        else:
+            self._method = self._calibrated()['method']
+        return self._method
+
+    def _cache_key(self):
+        return f'{self.algorithm}:{self.budget_ms:g}'
+
+    def _read_cache(self):
+        try:
+            with open(runtime_path(HASH_POLICY_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _cached_calibration(self):
+        return self._read_cache().get(self._cache_key())
+
+    def _calibrated(self, force=False):
+        """
+        Calibra uma vez por máquina; os workers reaproveitam o resultado.
+
+        Returns:
+            dict: 'method', 'timings_ms' e 'calibrated_at'
+        """
+        with file_lock('hash-policy.lock'):
+            cached = self._read_cache()
+            if not force and self._cache_key() in cached:
+                return cached[self._cache_key()]
+
+            method, timings = self.calibrate()
+            cached[self._cache_key()] = {'method': method, 'timings_ms': timings, 'calibrated_at': time.time()}
+            path = runtime_path(HASH_POLICY_FILE)
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(cached, f, indent=2)
+            os.replace(f"{path}.tmp", path)
+
+        print(f"Política de hash calibrada: {method} (orçamento {self.budget_ms:g} ms)")
+        return cached[self._cache_key()]
+
+    def calibrate(self):
+        """
+        Mede os candidatos e escolhe o mais forte dentro do orçamento.
+
+        Returns:
+            tuple: (método escolhido, dict método -> ms)
+        """
+        candidates = PBKDF2_CANDIDATES if self.algorithm == 'pbkdf2' else SCRYPT_CANDIDATES
+        timings = {}
+        chosen = candidates[0]
+        for method in candidates:
+            timings[method] = round(measure_method(method), 2)
+            if timings[method] <= self.budget_ms:
+                chosen = method
+            else:
+                break
+        return chosen, timings
+
+    def needs_rehash(self, pwhash):
+        """True se o hash foi gerado com método diferente do alvo."""
+        current = hash_method(pwhash)
+        return current is not None and current != self.method
+
+
+hasher = PasswordHasher.from_env()
+policy = HashPolicy.from_env()
+
+
+def hash_password(password):
+    """
+    Gera o hash de uma senha usando o pool e o método da política.
+
+    Raises:
+        HashingBusy: Se o pool estiver saturado
+    """
+    started = time.perf_counter()
+    try:
+        return hasher.generate(password, policy.method)
+    finally:
+        metrics.observe_hash('generate', time.perf_counter() - started)
+
+
+def verify_password(pwhash, password):
+    """
+    Verifica uma senha usando o pool.
+
+    Raises:
+        HashingBusy: Se o pool estiver saturado
+    """
+    started = time.perf_counter()
+    try:
+        return hasher.verify(pwhash, password)
+    finally:
+        metrics.observe_hash('verify', time.perf_counter() - started)
+
+
+def hash_report():
+    """
+    Distribuição de métodos de hash na tabela `users`.
+
+    Deve ser chamado dentro de um app context.
+
+    Returns:
+        list: Dicts com 'method', 'count', 'share', 'verify_ms' e 'on_policy'
+    """
+    from models import db, User
+
+    counts = Counter(
+        hash_method(pwhash) or '(vazio)'
+        for (pwhash,) in db.session.query(User.password_hash).yield_per(1000)
+    )
+    total = sum(counts.values()) or 1
+
+    report = []
+    for method, count in counts.most_common():
+        report.append({
+            'method': method,
+            'count': count,
+            'share': count / total,
+            'verify_ms': measure_method(method) if method != '(vazio)' else None,
+            'on_policy': method == policy.method,
+        })
+    return report
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'report'
+
+    if command == 'calibrate':
+        budget = policy.budget_ms or 100.0
+        result = HashPolicy(algorithm=policy.algorithm, budget_ms=budget)._calibrated(force=True)
+        for method, ms in result['timings_ms'].items():
+            print(f"{method:<24} {ms:>9.1f} ms")
+        print(f"Escolhido para {budget:g} ms: {result['method']} (gravado em {runtime_path(HASH_POLICY_FILE)})")
+
+    elif command == 'report':
+        from app import app
+
+        with app.app_context():
+            rows = hash_report()
+        print(f"Política atual: {policy.method}")
+        print(f"{'método':<24} {'usuários':>9} {'%':>7} {'verif. ms':>10}")
+        for row in rows:
+            ms = f"{row['verify_ms']:.1f}" if row['verify_ms'] is not None else '-'
+            mark = '' if row['on_policy'] else '  (fora da política)'
+            print(f"{row['method']:<24} {row['count']:>9} {row['share']:>7.1%} {ms:>10}{mark}")
+
+    else:
+        print("Uso: python hashing.py [report|calibrate]")
+        sys.exit(1)
@@ -0,0 +1,151 @@
+"""
+Cache HTTP das Páginas
+======================
+
+Validação condicional e cache de página inteira:
+
+- `/` (dashboard): ETag derivado da versão de permissões do usuário, da
+  versão do catálogo, do digest dos templates/manifestos de assets e do ano
+  do rodapé. Se o navegador envia o mesmo ETag (If-None-Match), a resposta
+  é um 304 vazio, sem consultar permissões nem renderizar nada.
+- Páginas públicas (`/privacidade`, `/login`): o HTML renderizado fica em
+  um cache por processo com TTL e é servido com ETag, para visitantes
+  anônimos sem mensagens (flash) pendentes.
+
+Nenhum dos dois se aplica quando há mensagens flash na sessão, já que elas
+são exibidas uma única vez.
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import hashlib
+import os
+from datetime import date, datetime
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+import versions
+from cache import LRUCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+
+_template_digest = None
+
+
+def template_digest():
+    """
+    Hash de todos os templates, dos manifestos de assets/imagens e do app.py
+    (dados estáticos do dashboard, como a equipe).
+
+    Calculado uma vez por processo (um deploy novo reinicia os workers).
+    """
+    global _template_digest
+    if _template_digest is None:
+        import assets
+        import images
+
+        digest = hashlib.sha1()
+        paths = []
+        for root, _dirs, files in os.walk(TEMPLATES_DIR):
+            paths.extend(os.path.join(root, name) for name in files)
+        paths.extend([assets.MANIFEST_FILE, images.MANIFEST_FILE, os.path.join(BASE_DIR, 'app.py')])
+        for path in sorted(paths):
+            try:
+                with open(path, 'rb') as f:
+                    digest.update(path.encode())
+                    digest.update(f.read())
+            except FileNotFoundError:
+                continue
+        _template_digest = digest.hexdigest()[:16]
+    return _template_digest
+
+
+def has_pending_flashes():
+    return bool(session.get('_flashes'))
+
+
+def dashboard_etag(user):
+    """ETag do dashboard para o usuário (sem consultar o banco)."""
+    parts = (
+        user.get_id(),
+        versions.epoch(),
+        versions.user_version(user.id),
+        versions.catalog_version(),
+        template_digest(),
+        datetime.now().year,
+    )
+    return hashlib.sha1('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+def conditional_dashboard(view):
+    """
+    Responde 304 ao dashboard quando o ETag do navegador ainda é válido.
+
+    A resposta renderizada recebe o ETag e `Cache-Control: private, no-cache`
+    (o navegador guarda, mas sempre revalida).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET' or has_pending_flashes():
+            return view(*args, **kwargs)
+
+        etag = dashboard_etag(current_user)
+        if etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    return wrapper
+
+
+page_cache = LRUCache(
+    maxsize=int(os.environ.get('PAGE_CACHE_SIZE', 64)),
+    ttl=int(os.environ.get('PAGE_CACHE_TTL', 300))
+)
+
+
+def cached_page(view=None, query_args=()):
+    """
+    Cache de página inteira para GETs anônimos sem mensagens flash.
+
+    A chave é o caminho mais os parâmetros da query string que a página lê
+    (`query_args`); os demais são ignorados, para que query strings
+    arbitrárias não criem entradas novas no cache. Inclui também a data do
+    dia, para páginas que exibem a data atual.
+
+    Uso: `@cached_page` ou `@cached_page(query_args=('pagina',))`.
+    """
+    if view is None:
+        return lambda view: cached_page(view, query_args=query_args)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET' or current_user.is_authenticated or has_pending_flashes():
+            return view(*args, **kwargs)
+
+        params = tuple((name, tuple(request.args.getlist(name))) for name in query_args)
+        key = (request.path, params, date.today())
+        cached = page_cache.get(key)
+        if cached is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            body = response.get_data()
+            cached = (body, response.mimetype, hashlib.sha1(body).hexdigest())
+            page_cache.set(key, cached)
+
+        body, mimetype, etag = cached
+        response = current_app.response_class(body, mimetype=mimetype)
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return wrapper
@@ -0,0 +1,174 @@
+"""
+Imagens Responsivas
+===================
+
+Gera versões redimensionadas e recomprimidas (formato original + WebP) das
+fotos da equipe e dos ícones dos sistemas, nas larguras em que são exibidos
+(1x, 2x e 3x), em `static/derived/`, com um `manifest.json`.
+
+Cada derivado fica em disco e só é refeito quando o hash da imagem original
+muda. Os templates usam a macro `picture` (templates/partials/picture.html),
+que monta o `srcset` a partir do manifesto; sem manifesto, a imagem original
+é usada. O `python assets.py build` executado depois versiona também os
+derivados.
+
+Requer Pillow (opcional: sem ele o build é pulado e nada muda).
+
+Uso:
+    python images.py build
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow é necessário apenas para o build
+    Image = None
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DERIVED_DIR = os.path.join(STATIC_DIR, 'derived')
+MANIFEST_FILE = os.path.join(DERIVED_DIR, 'manifest.json')
+
+# Larguras de exibição (CSS): ícones 64px, fotos da equipe 150px
+PROFILES = [
+    {'pattern': 'img/icon-*.png', 'widths': (64, 128, 192)},
+    {'pattern': 'img/*.jpg', 'widths': (150, 300, 450)},
+]
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+
+def _source_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _save(image, path, fmt):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if fmt == 'webp':
+        image.save(path, 'WEBP', quality=WEBP_QUALITY, method=6)
+    elif fmt == 'jpg':
+        image.convert('RGB').save(path, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(path, 'PNG', optimize=True)
+
+
+def _derive(relpath, widths, source_hash):
+    """Gera os derivados de uma imagem e retorna a entrada do manifesto."""
+    stem, ext = os.path.splitext(relpath)
+    fallback_fmt = 'jpg' if ext.lower() in ('.jpg', '.jpeg') else 'png'
+
+    with Image.open(os.path.join(STATIC_DIR, relpath)) as source:
+        source.load()
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGBA')
+        width, height = source.size
+
+        # Não amplia: larguras maiores que a original são descartadas
+        targets = [w for w in widths if w < width] or [width]
+
+        variants = {'webp': [], fallback_fmt: []}
+        for target in targets:
+            resized = source if target == width else source.resize(
+                (target, round(height * target / width)), Image.LANCZOS
+            )
+            for fmt in variants:
+                out = f"derived/{stem}-{target}w.{fmt}"
+                _save(resized, os.path.join(STATIC_DIR, out), fmt)
+                variants[fmt].append([target, out])
+
+    return {
+        'source_hash': source_hash,
+        'width': width,
+        'height': height,
+        'fallback': fallback_fmt,
+        'variants': variants,
+    }
+
+
+def build(verbose=True):
+    """
+    Gera (ou atualiza) os derivados e o manifesto.
+
+    Returns:
+        dict: manifesto {caminho original: entrada}
+    """
+    if Image is None:
+        print("Pillow não instalado; imagens responsivas não geradas.")
+        return {}
+
+    previous = load_manifest()
+    manifest = {}
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) not in (DERIVED_DIR, os.path.join(STATIC_DIR, 'dist'))]
+        for name in sorted(files):
+            relpath = os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, '/')
+            profile = next((p for p in PROFILES if fnmatch.fnmatch(relpath, p['pattern'])), None)
+            if profile is None:
+                continue
+
+            source_hash = _source_hash(os.path.join(STATIC_DIR, relpath))
+            entry = previous.get(relpath)
+            if entry and entry.get('source_hash') == source_hash and all(
+                os.path.exists(os.path.join(STATIC_DIR, path))
+                for variants in entry['variants'].values() for _, path in variants
+            ):
+                manifest[relpath] = entry
+                continue
+
+            if verbose:
+                print(f"Gerando derivados de {relpath}...")
+            manifest[relpath] = _derive(relpath, profile['widths'], source_hash)
+
+    os.makedirs(DERIVED_DIR, exist_ok=True)
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(path=MANIFEST_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def init_app(app):
+    """Disponibiliza `image_variants` e `image_srcset` para os templates."""
+    manifest = load_manifest()
+
+    def image_variants(filename):
+        return manifest.get(filename)
+
+    def image_srcset(filename, fmt=None):
+        entry = manifest.get(filename)
+        if not entry:
+            return ''
+        url_for = app.jinja_env.globals['url_for']
+        variants = entry['variants'][fmt or entry['fallback']]
+        return ', '.join(f"{url_for('static', filename=path)} {width}w" for width, path in variants)
+
+    app.jinja_env.globals.update(image_variants=image_variants, image_srcset=image_srcset)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'build':
+        print("Uso: python images.py build")
+        sys.exit(1)
+
+    result = build()
+    original = sum(os.path.getsize(os.path.join(STATIC_DIR, name)) for name in result)
+    smallest = sum(
+        os.path.getsize(os.path.join(STATIC_DIR, entry['variants']['webp'][0][1])) for entry in result.values()
+    )
+    print(f"{len(result)} imagens; originais {original / 1024:.0f} KiB, menor WebP {smallest / 1024:.0f} KiB.")
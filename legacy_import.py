@@ -0,0 +1,251 @@
+"""
+Importação de Usuários Legados
+==============================
+
+Importa o `users.json` legado para as tabelas `users` e
+`user_system_access` em lotes:
+
+- o arquivo é lido de forma incremental (um usuário por vez, sem carregar
+  a lista inteira na memória);
+- os emails já cadastrados são lidos em uma única consulta;
+- usuários novos e seus acessos (todos os sistemas, como no portal antigo)
+  são inseridos em INSERTs em lote, um commit por lote;
+- emails de administradores já existentes são promovidos a admin.
+
+Uso:
+    python legacy_import.py [caminho/users.json] [--chunk 1000]
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from models import db, System, User, UserSystemAccess, mark_user_changed
+
+USERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.json')
+
+ADMIN_EMAILS = ["admin@mendoncagalvao.com.br", "arthur.monteiro@mendoncagalvao.com.br"]
+
+READ_SIZE = 64 * 1024
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+# Formato usado pelo SQLAlchemy para DateTime no SQLite
+SQLITE_DATETIME = '%Y-%m-%d %H:%M:%S.%f'
+
+
+class _Reader:
+    """Buffer de texto sobre o arquivo, preenchido sob demanda."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        # Descarta o que já foi consumido
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Próximo caractere que não é espaço ('' no fim do arquivo)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"JSON inválido: esperado '{char}' na posição {self.pos}")
+        self.pos += 1
+
+    def value(self, decoder):
+        """Decodifica o próximo valor JSON completo."""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # Um número no fim do buffer pode estar incompleto
+            if end == len(self.buf) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_legacy_users(path=USERS_FILE):
+    """
+    Percorre os usuários de um users.json (`{"users": [...]}` ou lista).
+
+    Yields:
+        dict: um usuário por vez, na ordem do arquivo
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _Reader(f)
+        first = reader.peek()
+
+        if first == '{':
+            reader.expect('{')
+            while reader.peek() not in ('}', ''):
+                key = reader.value(decoder)
+                reader.expect(':')
+                if key != 'users':
+                    reader.value(decoder)
+                elif reader.peek() == '[':
+                    break
+                else:
+                    raise ValueError("JSON inválido: 'users' deve ser uma lista")
+                if reader.peek() == ',':
+                    reader.expect(',')
+            else:
+                return
+        elif first != '[':
+            return
+
+        reader.expect('[')
+        while reader.peek() not in (']', ''):
+            yield reader.value(decoder)
+            if reader.peek() == ',':
+                reader.expect(',')
+
+
+def _user_row(u_data):
+    email = u_data['email'].strip().lower()
+    created_at = u_data.get('created_at')
+    return {
+        'email': email,
+        'name': u_data.get('name') or email,
+        'password_hash': u_data.get('password_hash', ''),
+        'role': 'admin' if email in ADMIN_EMAILS else 'user',
+        'is_active': True,
+        'created_at': datetime.fromisoformat(created_at) if created_at else datetime.utcnow(),
+    }
+
+
+def _flush_chunk(rows, promote_ids, system_ids):
+    if rows:
+        created = db.session.execute(User.__table__.insert().returning(User.__table__.c.id), rows).scalars().all()
+        if system_ids and db.engine.dialect.name == 'sqlite':
+            # users x sistemas linhas: executemany direto no driver, sem o
+            # processamento de parâmetros por linha do SQLAlchemy
+            now = datetime.utcnow().strftime(SQLITE_DATETIME)
+            db.session.connection().exec_driver_sql(
+                "INSERT INTO user_system_access (user_id, system_id, granted_at) VALUES (?, ?, ?)",
+                [(user_id, system_id, now) for user_id in created for system_id in system_ids]
+            )
+        elif system_ids:
+            now = datetime.utcnow()
+            db.session.execute(
+                UserSystemAccess.__table__.insert(),
+                [
+                    {'user_id': user_id, 'system_id': system_id, 'granted_at': now}
+                    for user_id in created
+                    for system_id in system_ids
+                ]
+            )
+    if promote_ids:
+        db.session.execute(update(User).where(User.id.in_(promote_ids)).values(role='admin'))
+        for user_id in promote_ids:
+            mark_user_changed(user_id)
+    db.session.commit()
+
+
+def import_legacy_users(path=USERS_FILE, chunk_size=1000, progress=print):
+    """
+    Importa os usuários legados. Deve ser chamado dentro de um app context.
+
+    Args:
+        path (str): Caminho do users.json
+        chunk_size (int): Usuários por lote (um commit por lote)
+        progress (callable): Recebe as mensagens de progresso (None = silencioso)
+
+    Returns:
+        dict: read, created, promoted, skipped, seconds
+    """
+    stats = {'read': 0, 'created': 0, 'promoted': 0, 'skipped': 0, 'seconds': 0.0}
+    if not os.path.exists(path):
+        if progress:
+            progress(f"{path} não encontrado.")
+        return stats
+
+    started = time.perf_counter()
+
+    # Emails já cadastrados, em uma consulta
+    existing = {
+        email.lower(): (user_id, role)
+        for email, user_id, role in db.session.execute(select(User.email, User.id, User.role))
+    }
+    system_ids = list(db.session.scalars(select(System.id)))
+
+    rows, promote_ids = [], []
+    for u_data in iter_legacy_users(path):
+        stats['read'] += 1
+        try:
+            row = _user_row(u_data)
+        except (KeyError, AttributeError, TypeError, ValueError):
+            stats['skipped'] += 1
+            continue
+
+        email = row['email']
+        if email in existing:
+            user_id, role = existing[email]
+            if row['role'] == 'admin' and role != 'admin' and user_id is not None:
+                promote_ids.append(user_id)
+                existing[email] = (user_id, 'admin')
+                stats['promoted'] += 1
+            else:
+                stats['skipped'] += 1
+        else:
+            rows.append(row)
+            # Repetições do mesmo email no arquivo são ignoradas
+            existing[email] = (None, row['role'])
+
+        if len(rows) >= chunk_size or len(promote_ids) >= chunk_size:
+            _flush_chunk(rows, promote_ids, system_ids)
+            stats['created'] += len(rows)
+            rows, promote_ids = [], []
+            if progress:
+                elapsed = time.perf_counter() - started
+                progress(f"  {stats['read']} lidos, {stats['created']} criados "
+                         f"({stats['read'] / elapsed:.0f} usuários/s)")
+
+    _flush_chunk(rows, promote_ids, system_ids)
+    stats['created'] += len(rows)
+    stats['seconds'] = time.perf_counter() - started
+
+    if progress:
+        rate = stats['read'] / stats['seconds'] if stats['seconds'] else 0
+        progress(f"Importação concluída: {stats['read']} lidos, {stats['created']} criados, "
+                 f"{stats['promoted']} promovidos, {stats['skipped']} ignorados "
+                 f"em {stats['seconds']:.1f}s ({rate:.0f} usuários/s)")
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Importa usuários do users.json legado')
+    parser.add_argument('path', nargs='?', default=USERS_FILE)
+    parser.add_argument('--chunk', type=int, default=1000)
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        import_legacy_users(args.path, chunk_size=args.chunk)
@@ -0,0 +1,339 @@
+"""
+Métricas da Aplicação
+=====================
+
+Instrumentação por endpoint: histograma de latência, respostas por status,
+quantidade e tempo de instruções SQL (via eventos do engine do SQLAlchemy)
+e tempo de hash de senhas (scrypt/pbkdf2, ver hashing.py).
+
+Cada worker acumula os números em memória (um lock curto por request) e
+grava periodicamente um retrato em `var/metrics/<pid>.json`. O endpoint
+`/admin/metrics` soma os retratos de todos os workers e responde no formato
+de exposição do Prometheus.
+
+Ao sair, o worker grava o último retrato e o incorpora a
+`var/metrics/retired.json`; retratos de workers que morreram sem sair
+normalmente (ou cujo PID foi reaproveitado) são incorporados da mesma forma.
+Assim os contadores somados nunca diminuem.
+
+Desative com METRICS_ENABLED=0.
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+from sqlalchemy import event
+
+from runtime import file_lock, runtime_path
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+# Intervalo mínimo entre gravações do retrato do worker
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS_DIR = 'metrics'
+RETIRED_FILE = 'retired.json'
+LOCK_FILE = 'metrics.lock'
+
+
+def _new_endpoint():
+    return {
+        'count': 0,
+        'sum': 0.0,
+        'buckets': [0] * (len(BUCKETS) + 1),  # último = +Inf
+        'status': {},
+        'sql_count': 0,
+        'sql_seconds': 0.0,
+    }
+
+
+class MetricsRegistry:
+    """Agregados do processo atual."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._last_flush = 0.0
+        self._written = False
+        self.endpoints = {}
+        self.hashing = {}
+
+    def _check_fork(self):
+        # Após um fork, o filho começa do zero (o pai continua com os seus)
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+            self.endpoints = {}
+            self.hashing = {}
+            self._last_flush = 0.0
+            self._written = False
+
+    def observe_request(self, endpoint, method, status, seconds, sql_count, sql_seconds):
+        self._check_fork()
+        index = bisect_left(BUCKETS, seconds)
+        key = f"{endpoint}|{method}"
+        with self._lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = _new_endpoint()
+            stats['count'] += 1
+            stats['sum'] += seconds
+            stats['buckets'][index] += 1
+            stats['status'][str(status)] = stats['status'].get(str(status), 0) + 1
+            stats['sql_count'] += sql_count
+            stats['sql_seconds'] += sql_seconds
+
+    def observe_hash(self, operation, seconds):
+        self._check_fork()
+        with self._lock:
+            stats = self.hashing.setdefault(operation, {'count': 0, 'sum': 0.0})
+            stats['count'] += 1
+            stats['sum'] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps({'endpoints': self.endpoints, 'hashing': self.hashing}))
+
+    def flush(self, force=False):
+        """Grava o retrato do worker (no máximo a cada METRICS_FLUSH_SECONDS)."""
+        self._check_fork()
+        now = time.monotonic()
+        if not force and now - self._last_flush < METRICS_FLUSH_SECONDS:
+            return
+        self._last_flush = now
+
+        path = runtime_path(METRICS_DIR, f"{self._pid}.json")
+        if not self._written:
+            # Um retrato com o nosso PID é de um processo anterior
+            with file_lock(LOCK_FILE):
+                _retire(path)
+            self._written = True
+
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def retire(self):
+        """Grava o último retrato e o incorpora ao acumulado (saída do worker)."""
+        self._check_fork()
+        if not self._written and not self.endpoints and not self.hashing:
+            return
+        self.flush(force=True)
+        with file_lock(LOCK_FILE):
+            _retire(runtime_path(METRICS_DIR, f"{self._pid}.json"))
+
+
+registry = MetricsRegistry()
+
+# Contadores SQL do request da thread atual
+_local = threading.local()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get('metrics_query_start')
+    if not stack:
+        return
+    started = stack.pop()
+    current = getattr(_local, 'sql', None)
+    if current is not None:
+        current[0] += 1
+        current[1] += time.perf_counter() - started
+
+
+def observe_hash(operation, seconds):
+    """Registra o tempo de um hash/verificação de senha."""
+    if METRICS_ENABLED:
+        registry.observe_hash(operation, seconds)
+
+
+def init_app(app, db):
+    """Registra os hooks de request e os eventos do engine."""
+    if not METRICS_ENABLED:
+        return
+
+    # Sem isso, até METRICS_FLUSH_SECONDS de dados se perdem quando o worker sai
+    atexit.register(registry.retire)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def _start_request_metrics():
+        g._metrics_started = time.perf_counter()
+        _local.sql = [0, 0.0]
+
+    @app.after_request
+    def _record_request_metrics(response):
+        started = g.pop('_metrics_started', None)
+        sql = getattr(_local, 'sql', None) or [0, 0.0]
+        _local.sql = None
+        if started is not None:
+            registry.observe_request(
+                request.endpoint or '(not_found)', request.method, response.status_code,
+                time.perf_counter() - started, sql[0], sql[1]
+            )
+            registry.flush()
+        return response
+
+
+def _read(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _accumulate(endpoints, hashing, data):
+    """Soma um retrato (ou o acumulado) em `endpoints` e `hashing`."""
+    for key, stats in data.get('endpoints', {}).items():
+        total = endpoints.setdefault(key, _new_endpoint())
+        total['count'] += stats['count']
+        total['sum'] += stats['sum']
+        total['buckets'] = [a + b for a, b in zip(total['buckets'], stats['buckets'])]
+        for status, count in stats['status'].items():
+            total['status'][status] = total['status'].get(status, 0) + count
+        total['sql_count'] += stats['sql_count']
+        total['sql_seconds'] += stats['sql_seconds']
+
+    for operation, stats in data.get('hashing', {}).items():
+        total = hashing.setdefault(operation, {'count': 0, 'sum': 0.0})
+        total['count'] += stats['count']
+        total['sum'] += stats['sum']
+
+
+def _retire(path):
+    """Incorpora o retrato de um worker encerrado ao acumulado (sob LOCK_FILE)."""
+    data = _read(path)
+    if data is not None:
+        retired_path = runtime_path(METRICS_DIR, RETIRED_FILE)
+        retired = _read(retired_path) or {}
+        endpoints, hashing = retired.get('endpoints', {}), retired.get('hashing', {})
+        _accumulate(endpoints, hashing, data)
+
+        tmp = f"{retired_path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'endpoints': endpoints, 'hashing': hashing}, f)
+        os.replace(tmp, retired_path)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:  # sem permissão: o processo existe
+        return True
+    return True
+
+
+def _merged():
+    """Soma os retratos dos workers vivos e o acumulado dos encerrados."""
+    registry.flush(force=True)
+    endpoints, hashing = {}, {}
+    workers = 0
+    with file_lock(LOCK_FILE):
+        retired = _read(runtime_path(METRICS_DIR, RETIRED_FILE))
+        if retired:
+            _accumulate(endpoints, hashing, retired)
+
+        for path in glob.glob(os.path.join(runtime_path(METRICS_DIR, ''), '*.json')):
+            name = os.path.basename(path)[:-len('.json')]
+            if not name.isdigit():
+                continue
+            if not _pid_alive(int(name)):
+                # Worker morto sem passar pelo atexit (kill, OOM)
+                _accumulate(endpoints, hashing, _read(path) or {})
+                _retire(path)
+                continue
+
+            data = _read(path)
+            if data is None:
+                continue
+            workers += 1
+            _accumulate(endpoints, hashing, data)
+
+    return endpoints, hashing, workers
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def render_prometheus():
+    """Métricas de todos os workers no formato de texto do Prometheus."""
+    endpoints, hashing, workers = _merged()
+    lines = [
+        '# HELP portal_metrics_workers Workers com métricas registradas.',
+        '# TYPE portal_metrics_workers gauge',
+        f'portal_metrics_workers {workers}',
+        '# HELP portal_http_request_duration_seconds Latência das requisições por endpoint.',
+        '# TYPE portal_http_request_duration_seconds histogram',
+    ]
+
+    parsed = sorted((key.split('|', 1), stats) for key, stats in endpoints.items())
+    for (endpoint, method), stats in parsed:
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), stats['buckets']):
+            cumulative += count
+            le = bound if bound == '+Inf' else repr(bound)
+            lines.append(f"portal_http_request_duration_seconds_bucket"
+                         f"{_labels(endpoint=endpoint, method=method, le=le)} {cumulative}")
+        lines.append(f"portal_http_request_duration_seconds_sum{_labels(endpoint=endpoint, method=method)} {stats['sum']:.6f}")
+        lines.append(f"portal_http_request_duration_seconds_count{_labels(endpoint=endpoint, method=method)} {stats['count']}")
+
+    lines += [
+        '# HELP portal_http_responses_total Respostas por endpoint e status.',
+        '# TYPE portal_http_responses_total counter',
+    ]
+    for (endpoint, method), stats in parsed:
+        for status, count in sorted(stats['status'].items()):
+            lines.append(f"portal_http_responses_total{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+
+    lines += [
+        '# HELP portal_sql_statements_total Instruções SQL executadas por endpoint.',
+        '# TYPE portal_sql_statements_total counter',
+    ]
+    for (endpoint, method), stats in parsed:
+        lines.append(f"portal_sql_statements_total{_labels(endpoint=endpoint, method=method)} {stats['sql_count']}")
+
+    lines += [
+        '# HELP portal_sql_duration_seconds_total Tempo em instruções SQL por endpoint.',
+        '# TYPE portal_sql_duration_seconds_total counter',
+    ]
+    for (endpoint, method), stats in parsed:
+        lines.append(f"portal_sql_duration_seconds_total{_labels(endpoint=endpoint, method=method)} {stats['sql_seconds']:.6f}")
+
+    lines += [
+        '# HELP portal_password_hash_seconds Tempo de hash/verificação de senhas.',
+        '# TYPE portal_password_hash_seconds summary',
+    ]
+    for operation, stats in sorted(hashing.items()):
+        lines.append(f"portal_password_hash_seconds_sum{_labels(operation=operation)} {stats['sum']:.6f}")
+        lines.append(f"portal_password_hash_seconds_count{_labels(operation=operation)} {stats['count']}")
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,260 @@
+"""
+Migrações do Banco de Dados
+===========================
+
+Migrações numeradas, aplicadas em ordem e registradas na tabela
+`schema_version` (linha única com o número da última migração aplicada).
+
+Na inicialização de cada worker, `upgrade()` lê apenas essa linha: se o
+esquema já está na versão atual, nada mais é feito (sem reflexão de
+tabelas). Caso contrário as migrações pendentes rodam sob um lock de
+arquivo, de modo que só um processo migra e popula o banco; os demais
+esperam e, ao obter o lock, encontram a versão já atualizada.
+
+Bancos criados antes das migrações (sem `schema_version`, mas com a
+tabela `users`) já passaram pela criação das tabelas, pela carga dos
+sistemas e pela importação do users.json feitas pelo app antigo: são
+registrados diretamente na versão BASELINE_VERSION, sem rodar essas
+migrações (que recriariam sistemas e usuários removidos por um admin), e
+seguem a partir dela. Só um banco vazio começa da versão 0.
+
+Uso:
+    python migrations.py [upgrade|status]
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, inspect, select
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from models import db, System, User, UserSystemAccess, AuditLog, EmailOutbox, DashboardCounters
+from runtime import file_lock
+
+SYSTEMS_DATA = [
+    {
+        'id': 'portal-colaborador',
+        'name': 'Portal do Colaborador',
+        'description': 'Gerencie suas informações pessoais, contracheques, férias e benefícios de forma rápida e segura.',
+        'url': 'https://portalcolabmg.lovable.app/login',
+        'icon_class': 'icon-portal.png',
+        'category': 'main',
+        'is_public': True
+    },
+    {
+        'id': 'sistema-comissao',
+        'name': 'Sistema de Cálculo de Comissão',
+        'description': 'Calcule suas comissões de forma automática e transparente, com relatórios detalhados.',
+        'url': 'https://calculadp.lovable.app/',
+        'icon_class': 'icon-comissao.png',
+        'category': 'main',
+        'is_public': False
+    },
+    {
+        'id': 'ponto-eletronico',
+        'name': 'Processamento Inteligente de Ponto Eletrônico',
+        'description': 'Faça upload dos espelhos de ponto (PDF ou Imagem). O sistema identifica automaticamente faltas (integrais e parciais), horas extras e adicional noturno.',
+        'url': 'https://ai.studio/apps/drive/1g4DXIeeEt42F_J29UEPp15DgEww1PkuM?fullscreenApplet=true',
+        'icon_class': 'icon-ponto.png',
+        'category': 'automation',
+        'is_public': False
+    },
+    {
+        'id': 'adiantamento-salarial',
+        'name': 'Cálculo Automático de Adiantamento',
+        'description': 'Importe o PDF da folha de pagamento para iniciar o processamento automático de adiantamento salarial mensal.',
+        'url': 'https://ai.studio/apps/drive/14NzWtRjoDQhHhwxaDIeZisxTAzIZDkvq?fullscreenApplet=true',
+        'icon_class': 'icon-adiantamento.png',
+        'category': 'automation',
+        'is_public': False
+    },
+    {
+        'id': 'grid-x',
+        'name': 'GridX',
+        'description': 'Seu conversor inteligente para Windows. Transforme dados em insights de forma rápida, simples e eficiente.',
+        'url': 'https://gridx.lovable.app/',
+        'icon_class': 'icon-gridx.png',
+        'category': 'main',
+        'is_public': True
+    },
+    {
+        'id': 'arca-mg',
+        'name': 'Arca MG',
+        'description': 'Analisador de Documentos. Envie seus arquivos Excel e PDF para análise inteligente e correlação de dados.',
+        'url': 'https://arcamg.lovable.app/',
+        'icon_class': 'icon-arca.png',
+        'category': 'main',
+        'is_public': True
+    },
+    {
+        'id': 'aeronord-convocacoes',
+        'name': 'Aeronord - Convocações & Recibos',
+        'description': 'Sistema interno para cálculo automático de convocações e geração de recibos da Aeronord, com interface dark premium, apuração mensal consolidada',
+        'url': 'https://nordcv.lovable.app/cv',
+        'icon_class': 'icon-aeronord.png',
+        'category': 'main',
+        'is_public': True
+    },
+    {
+        'id': 'calculadora-rescisao',
+        'name': 'Calculadora de Rescisão',
+        'description': 'Ferramenta automática para cálculo de rescisão trabalhista com interface intuitiva e cálculos precisos',
+        'url': 'https://calculadoramg.lovable.app/',
+        'icon_class': 'icon-rescisao.png',
+        'category': 'main',
+        'is_public': True
+    }
+]
+
+# Fora de db.metadata: não é criada pelo create_all das migrações
+_meta = MetaData()
+schema_version = Table(
+    'schema_version', _meta,
+    Column('id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False),
+    Column('applied_at', DateTime),
+)
+
+
+# --- Migrações ---
+# Cada função roda dentro de um app context e deve ser idempotente.
+
+def _create_base_tables():
+    db.metadata.create_all(
+        db.engine,
+        tables=[System.__table__, User.__table__, UserSystemAccess.__table__, AuditLog.__table__]
+    )
+
+
+def _seed_systems():
+    existing = set(db.session.scalars(select(System.id)))
+    for data in SYSTEMS_DATA:
+        if data['id'] not in existing:
+            print(f"Criando sistema: {data['name']}")
+            db.session.add(System(**data))
+    db.session.commit()
+
+
+def _migrate_legacy_users():
+    from legacy_import import import_legacy_users
+    import_legacy_users()
+
+
+def _create_missing_indexes():
+    # Índices adicionados depois da criação das tabelas (users, audit_logs)
+    for table in (User.__table__, AuditLog.__table__):
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+
+def _create_email_outbox():
+    db.metadata.create_all(db.engine, tables=[EmailOutbox.__table__])
+
+
+def _create_user_search_index():
+    from user_search import ensure_user_search_index
+    ensure_user_search_index(db.engine)
+
+
+def _create_dashboard_counters():
+    from counters import ensure_dashboard_counters
+    db.metadata.create_all(db.engine, tables=[DashboardCounters.__table__])
+    ensure_dashboard_counters(db.engine)
+
+
+MIGRATIONS = [
+    (1, 'tabelas base (users, systems, user_system_access, audit_logs)', _create_base_tables),
+    (2, 'sistemas padrão', _seed_systems),
+    (3, 'usuários legados do users.json', _migrate_legacy_users),
+    (4, 'índices de users e audit_logs', _create_missing_indexes),
+    (5, 'fila de emails (email_outbox)', _create_email_outbox),
+    (6, 'busca de usuários (FTS5 trigram)', _create_user_search_index),
+    (7, 'contadores do painel', _create_dashboard_counters),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Estado dos bancos criados pelo app antes das migrações numeradas
+# (tabelas base, sistemas padrão e usuários legados)
+BASELINE_VERSION = 3
+
+
+def current_version():
+    """
+    Versão do esquema (0 se `schema_version` ainda não existe).
+
+    Deve ser chamado dentro de um app context.
+    """
+    try:
+        with db.engine.connect() as conn:
+            version = conn.execute(
+                select(schema_version.c.version).where(schema_version.c.id == 1)
+            ).scalar()
+    except (OperationalError, ProgrammingError):
+        return 0
+    return version or 0
+
+
+def _set_version(version):
+    with db.engine.begin() as conn:
+        _meta.create_all(conn)
+        updated = conn.execute(
+            schema_version.update().where(schema_version.c.id == 1).values(
+                version=version, applied_at=datetime.utcnow()
+            )
+        ).rowcount
+        if not updated:
+            conn.execute(schema_version.insert().values(id=1, version=version, applied_at=datetime.utcnow()))
+
+
+def upgrade():
+    """
+    Aplica as migrações pendentes. Deve ser chamado dentro de um app context.
+
+    Returns:
+        list: números das migrações aplicadas (vazia se o esquema está atual)
+    """
+    # Caminho rápido: uma leitura de uma linha
+    if current_version() >= LATEST_VERSION:
+        return []
+
+    applied = []
+    with file_lock('migrations'):
+        # Outro processo pode ter migrado enquanto este esperava o lock
+        version = current_version()
+        if version == 0 and inspect(db.engine).has_table('users'):
+            print(f"Banco existente sem schema_version: registrado na versão {BASELINE_VERSION}.")
+            version = BASELINE_VERSION
+            _set_version(version)
+        for number, description, migrate in MIGRATIONS:
+            if number <= version:
+                continue
+            print(f"Migração {number:03d}: {description}...")
+            migrate()
+            _set_version(number)
+            applied.append(number)
+
+    if applied:
+        print(f"Esquema atualizado para a versão {LATEST_VERSION}.")
+    return applied
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'upgrade'
+    if command not in ('upgrade', 'status'):
+        print("Uso: python migrations.py [upgrade|status]")
+        sys.exit(1)
+
+    # Importar o app já aplica as migrações pendentes
+    from app import app
+
+    with app.app_context():
+        if command == 'upgrade':
+            upgrade()
+        version = current_version()
+        print(f"Versão do esquema: {version} (mais recente: {LATEST_VERSION})")
+        if version < LATEST_VERSION:
+            sys.exit(2)
@@ -1,6 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from itertools import chain
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import versions
 
 # Initialize SQLAlchemy
 db = SQLAlchemy()
@@ -34,7 +39,39 @@ class User(UserMixin, db.Model):
     
     # Relationships
     permissions = db.relationship('UserSystemAccess', foreign_keys='UserSystemAccess.user_id', backref='user', lazy=True)
+
+    # Listagem do admin em ordem de nome (paginação por cursor)
+    __table_args__ = (
+        db.Index('ix_users_name_id', 'name', 'id'),
+    )
     
+    def load_permissions(self, catalog=None):
+        """
+        Resolve as permissões efetivas do usuário.
+
+        Combina o catálogo em cache (ver `catalog.py`) com as concessões do
+        usuário, lidas em uma única consulta, e popula `_cached_permissions`
+        (sistemas públicos + concedidos), usado por `has_access` sem novas
+        consultas durante o request.
+
+        Args:
+            catalog (Catalog): Retrato do catálogo a usar (padrão: o atual)
+
+        Returns:
+            list: Tuplas (SystemRecord, concedido) para todos os sistemas
+        """
+        if catalog is None:
+            from catalog import get_catalog
+            catalog = get_catalog()
+
+        granted_ids = {
+            system_id for (system_id,) in
+            db.session.query(UserSystemAccess.system_id).filter_by(user_id=self.id)
+        }
+
+        self._cached_permissions = catalog.public_ids | granted_ids
+        return [(system, system.id in granted_ids) for system in catalog.systems]
+
     def has_access(self, system_id):
         """Verifica se o usuário tem acesso a um sistema específico"""
         if self.role == 'admin':
@@ -73,3 +110,82 @@ class AuditLog(db.Model):
     action = db.Column(db.String(50), nullable=False) # GRANT_ACCESS, REVOKE_ACCESS, etc.
     meta_info = db.Column(db.JSON) # Extra details
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Índices para listagem em ordem cronológica reversa (keyset) por filtro
+    __table_args__ = (
+        db.Index('ix_audit_logs_created', 'created_at', 'id'),
+        db.Index('ix_audit_logs_actor_created', 'actor_id', 'created_at', 'id'),
+        db.Index('ix_audit_logs_action_created', 'action', 'created_at', 'id'),
+        db.Index('ix_audit_logs_target_created', 'target_id', 'created_at', 'id'),
+    )
+
+
+class EmailOutbox(db.Model):
+    """Fila persistente de emails (enviados em segundo plano por outbox.py)"""
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    sender = db.Column(db.String(120), nullable=False)
+    recipients = db.Column(db.JSON, nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    html = db.Column(db.Text)
+    status = db.Column(db.String(20), default='pending', nullable=False) # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claimed_by = db.Column(db.String(40))
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next', 'status', 'next_attempt_at'),
+    )
+
+class DashboardCounters(db.Model):
+    """Contadores do painel admin (linha única, mantida por triggers; ver counters.py)"""
+    __tablename__ = 'dashboard_counters'
+
+    id = db.Column(db.Integer, primary_key=True)
+    users_count = db.Column(db.Integer, default=0, nullable=False)
+    active_users = db.Column(db.Integer, default=0, nullable=False)
+    systems_count = db.Column(db.Integer, default=0, nullable=False)
+    reconciled_at = db.Column(db.DateTime)
+
+# --- Invalidação de caches ---
+# Alterações no catálogo e em usuários/permissões são detectadas no flush e
+# publicadas apenas após o commit, para que outros workers nunca recarreguem
+# dados não confirmados.
+
+def mark_user_changed(user_id, session=None):
+    """
+    Marca um usuário como alterado na transação atual.
+
+    Necessário apenas para alterações feitas com UPDATE/DELETE em massa,
+    que não passam pelo flush do ORM.
+    """
+    session = session or db.session
+    session.info.setdefault('changed_users', set()).add(user_id)
+
+@event.listens_for(Session, 'after_flush')
+def _track_cache_changes(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, System):
+            session.info['catalog_changed'] = True
+        elif isinstance(obj, User) and obj.id is not None:
+            mark_user_changed(obj.id, session)
+        elif isinstance(obj, UserSystemAccess) and obj.user_id is not None:
+            mark_user_changed(obj.user_id, session)
+
+@event.listens_for(Session, 'after_commit')
+def _publish_cache_changes(session):
+    if session.info.pop('catalog_changed', False):
+        versions.bump_catalog_version()
+    changed_users = session.info.pop('changed_users', None)
+    if changed_users:
+        versions.bump_user_versions(changed_users)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_cache_changes(session):
+    session.info.pop('catalog_changed', None)
+    session.info.pop('changed_users', None)
@@ -0,0 +1,181 @@
+"""
+Outbox de Emails
+================
+
+O request apenas grava a mensagem na tabela `email_outbox` e retorna; uma
+thread em segundo plano envia as mensagens em lotes, reaproveitando uma
+única conexão SMTP por lote, com novas tentativas e backoff exponencial.
+
+Vários workers podem rodar o envio ao mesmo tempo: cada lote é reservado
+com um UPDATE atômico (`claimed_by`), e reservas abandonadas (worker morto
+no meio do envio) voltam para a fila depois de OUTBOX_CLAIM_TIMEOUT.
+
+Configuração (variáveis de ambiente):
+    OUTBOX_WORKER          0 desativa a thread de envio neste processo
+    OUTBOX_BATCH_SIZE      Mensagens por conexão SMTP (padrão 20)
+    OUTBOX_POLL_SECONDS    Intervalo máximo entre varreduras (padrão 5)
+    OUTBOX_MAX_ATTEMPTS    Tentativas antes de marcar como 'failed' (padrão 6)
+    OUTBOX_BACKOFF_SECONDS Espera base entre tentativas (padrão 30, dobra a cada falha)
+    OUTBOX_CLAIM_TIMEOUT   Segundos até uma reserva ser considerada abandonada (padrão 300)
+
+Para testar localmente, suba um servidor SMTP de teste e aponte o app
+para ele (MAIL_SERVER, MAIL_PORT, MAIL_USE_TLS):
+
+    python -m aiosmtpd -n -l localhost:8025
+    MAIL_SERVER=localhost MAIL_PORT=8025 MAIL_USE_TLS=0 MAIL_USERNAME=teste python app.py
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from flask_mail import Message
+
+from models import db, EmailOutbox
+
+BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 20))
+POLL_SECONDS = float(os.environ.get('OUTBOX_POLL_SECONDS', 5))
+MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 6))
+BACKOFF_SECONDS = float(os.environ.get('OUTBOX_BACKOFF_SECONDS', 30))
+CLAIM_TIMEOUT = float(os.environ.get('OUTBOX_CLAIM_TIMEOUT', 300))
+
+_wakeup = threading.Event()
+
+
+def enqueue_email(msg):
+    """
+    Grava uma mensagem na outbox e acorda a thread de envio.
+
+    Args:
+        msg (flask_mail.Message): Mensagem já montada (assunto, destinatários, html)
+
+    Returns:
+        EmailOutbox: Registro criado
+    """
+    entry = EmailOutbox(
+        sender=msg.sender if isinstance(msg.sender, str) else msg.sender[1],
+        recipients=list(msg.recipients),
+        subject=msg.subject,
+        html=msg.html,
+    )
+    db.session.add(entry)
+    db.session.commit()
+    _wakeup.set()
+    return entry
+
+
+def _backoff(attempts):
+    return timedelta(seconds=BACKOFF_SECONDS * (2 ** max(attempts - 1, 0)))
+
+
+class OutboxSender:
+    """Envia lotes da outbox usando uma conexão SMTP por lote."""
+
+    def __init__(self, app, mail):
+        self.app = app
+        self.mail = mail
+        self.worker_id = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+    def _claim(self, now):
+        """Reserva até BATCH_SIZE mensagens prontas para envio."""
+        stale_before = now - timedelta(seconds=CLAIM_TIMEOUT)
+        ready = db.session.query(EmailOutbox.id).filter(
+            db.or_(
+                db.and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now),
+                db.and_(EmailOutbox.status == 'sending', EmailOutbox.claimed_at < stale_before),
+            )
+        ).order_by(EmailOutbox.next_attempt_at).limit(BATCH_SIZE)
+
+        claimed = EmailOutbox.query.filter(
+            EmailOutbox.id.in_(ready.scalar_subquery()),
+            # Revalida o status: outro worker pode ter reservado no meio tempo
+            db.or_(EmailOutbox.status == 'pending', EmailOutbox.claimed_at < stale_before),
+        ).update(
+            {'status': 'sending', 'claimed_by': self.worker_id, 'claimed_at': now},
+            synchronize_session=False,
+        )
+        db.session.commit()
+        if not claimed:
+            return []
+
+        return EmailOutbox.query.filter_by(status='sending', claimed_by=self.worker_id).all()
+
+    def _mark_failed(self, entry, error, now):
+        entry.attempts += 1
+        entry.last_error = str(error)[:500]
+        entry.claimed_by = None
+        if entry.attempts >= MAX_ATTEMPTS:
+            entry.status = 'failed'
+        else:
+            entry.status = 'pending'
+            entry.next_attempt_at = now + _backoff(entry.attempts)
+
+    def send_batch(self):
+        """
+        Envia um lote. Deve ser chamado dentro de um app context.
+
+        Returns:
+            int: Quantidade de mensagens processadas (enviadas ou com falha)
+        """
+        now = datetime.utcnow()
+        batch = self._claim(now)
+        if not batch:
+            return 0
+
+        try:
+            with self.mail.connect() as connection:
+                for entry in batch:
+                    msg = Message(entry.subject, sender=entry.sender, recipients=entry.recipients, html=entry.html)
+                    try:
+                        connection.send(msg)
+                    except Exception as e:
+                        self._mark_failed(entry, e, now)
+                    else:
+                        entry.status = 'sent'
+                        entry.attempts += 1
+                        entry.sent_at = datetime.utcnow()
+                        entry.claimed_by = None
+        except Exception as e:
+            # Falha ao conectar/autenticar: o lote inteiro volta para a fila
+            print(f"ERRO na conexão SMTP da outbox: {e}")
+            for entry in batch:
+                if entry.status == 'sending':
+                    self._mark_failed(entry, e, now)
+
+        db.session.commit()
+        return len(batch)
+
+    def run_forever(self):
+        while True:
+            _wakeup.wait(POLL_SECONDS)
+            _wakeup.clear()
+            try:
+                with self.app.app_context():
+                    # Esvazia o que estiver pronto antes de voltar a dormir
+                    while self.send_batch() == BATCH_SIZE:
+                        pass
+            except Exception as e:
+                print(f"ERRO na thread da outbox: {e}")
+
+
+_started_pid = None
+_start_lock = threading.Lock()
+
+
+def start_outbox_worker(app, mail):
+    """Inicia (uma vez por processo) a thread de envio da outbox."""
+    global _started_pid
+    # Comparar o PID cobre o caso de fork depois do início (threads não sobrevivem ao fork)
+    if _started_pid == os.getpid():
+        return
+    with _start_lock:
+        if _started_pid == os.getpid():
+            return
+        sender = OutboxSender(app, mail)
+        threading.Thread(target=sender.run_forever, name='email-outbox', daemon=True).start()
+        _started_pid = os.getpid()
+        _wakeup.set()
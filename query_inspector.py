@@ -0,0 +1,208 @@
+"""
+Inspetor de Consultas (Desenvolvimento)
+=======================================
+
+Registra as instruções SQL de cada request e avisa quando a mesma consulta
+(mesmo "fingerprint": SQL normalizado, sem valores) se repete mais vezes
+que o limite, indicando a linha do código do portal que a disparou. É o
+padrão típico de N+1 (ex.: uma consulta por sistema dentro de um laço).
+
+Ativado automaticamente com `python app.py` (modo debug) ou com
+QUERY_INSPECTOR=1. Outras variáveis:
+
+- QUERY_REPEAT_THRESHOLD: repetições a partir das quais avisa (padrão 3)
+- QUERY_LOG=1: imprime todas as consultas de cada request
+- QUERY_BUDGET_STRICT=1: exceder o orçamento de um endpoint (`budget`)
+  levanta `QueryBudgetExceeded` em vez de só avisar (útil em testes)
+
+Orçamento em testes/scripts:
+
+    with query_budget(2):
+        client.get('/')
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import hashlib
+import os
+import re
+import threading
+import traceback
+from collections import Counter
+from contextlib import ContextDecorator
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 3))
+QUERY_LOG = os.environ.get('QUERY_LOG', '').lower() in ('1', 'true', 'yes')
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', '').lower() in ('1', 'true', 'yes')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+_local = threading.local()
+_installed = False
+_install_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Mais consultas SQL que o orçamento definido."""
+
+
+class _Collector:
+    """Consultas observadas em um request ou bloco `query_budget`."""
+
+    def __init__(self):
+        self.count = 0
+        self.by_fingerprint = {}
+
+    def add(self, fingerprint, statement, site):
+        self.count += 1
+        entry = self.by_fingerprint.get(fingerprint)
+        if entry is None:
+            entry = self.by_fingerprint[fingerprint] = {'sql': statement, 'count': 0, 'sites': Counter()}
+        entry['count'] += 1
+        entry['sites'][site] += 1
+
+    def repeated(self, threshold):
+        return sorted(
+            (entry for entry in self.by_fingerprint.values() if entry['count'] >= threshold),
+            key=lambda entry: -entry['count']
+        )
+
+    def summary(self, limit=5):
+        lines = []
+        for entry in sorted(self.by_fingerprint.values(), key=lambda e: -e['count'])[:limit]:
+            site, _ = entry['sites'].most_common(1)[0]
+            lines.append(f"  {entry['count']}x {entry['sql'][:120]} (em {site})")
+        return '\n'.join(lines)
+
+
+def fingerprint(statement):
+    """SQL normalizado (sem literais, listas IN colapsadas) e seu hash curto."""
+    normalized = _STRING_RE.sub('?', statement)
+    normalized = _NUMBER_RE.sub('?', normalized)
+    normalized = _IN_LIST_RE.sub('(?)', normalized)
+    normalized = _SPACE_RE.sub(' ', normalized).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+def call_site():
+    """Primeira linha do código do portal na pilha (fora deste módulo)."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if (filename.startswith(BASE_DIR) and 'site-packages' not in filename
+                and filename != os.path.abspath(__file__)):
+            return f"{os.path.relpath(filename, BASE_DIR)}:{frame.lineno} {frame.name}"
+    return '(desconhecido)'
+
+
+def _active_collectors():
+    collectors = list(getattr(_local, 'budgets', ()))
+    current = getattr(_local, 'request', None)
+    if current is not None:
+        collectors.append(current)
+    return collectors
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = _active_collectors()
+    if not collectors:
+        return
+    key, normalized = fingerprint(statement)
+    site = call_site()
+    for collector in collectors:
+        collector.add(key, normalized, site)
+    if QUERY_LOG and getattr(_local, 'request', None) is not None:
+        print(f"[sql] {normalized[:160]} (em {site})")
+
+
+def _install():
+    global _installed
+    with _install_lock:
+        if not _installed:
+            # Em nível de classe: vale para todos os engines, inclusive os já criados
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            _installed = True
+
+
+class query_budget(ContextDecorator):
+    """
+    Falha (QueryBudgetExceeded) se o bloco executar mais de `max_queries`
+    instruções SQL na thread atual. Pode ser usado como decorator.
+    """
+
+    def __init__(self, max_queries):
+        self.max_queries = max_queries
+        self.collector = None
+
+    def __enter__(self):
+        _install()
+        self.collector = _Collector()
+        if not hasattr(_local, 'budgets'):
+            _local.budgets = []
+        _local.budgets.append(self.collector)
+        return self.collector
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.budgets.remove(self.collector)
+        if exc_type is None and self.collector.count > self.max_queries:
+            raise QueryBudgetExceeded(
+                f"{self.collector.count} consultas SQL (orçamento: {self.max_queries}):\n"
+                f"{self.collector.summary()}"
+            )
+        return False
+
+
+def budget(max_queries):
+    """
+    Declara o orçamento de consultas de uma view. Sem custo em produção:
+    só é verificado quando o inspetor está ativo.
+    """
+    def decorator(view):
+        view._query_budget = max_queries
+        return view
+    return decorator
+
+
+def init_app(app):
+    """Ativa o inspetor para os requests do app (idempotente)."""
+    if app.extensions.get('query_inspector'):
+        return
+    app.extensions['query_inspector'] = True
+    _install()
+
+    @app.before_request
+    def _start_query_inspection():
+        _local.request = _Collector()
+
+    @app.after_request
+    def _finish_query_inspection(response):
+        collector = getattr(_local, 'request', None)
+        _local.request = None
+        if collector is None:
+            return response
+
+        label = f"{request.method} {request.path}"
+        response.headers['X-Query-Count'] = str(collector.count)
+
+        for entry in collector.repeated(QUERY_REPEAT_THRESHOLD):
+            sites = ', '.join(f"{site} ({count}x)" for site, count in entry['sites'].most_common(3))
+            print(f"[consultas] {label}: repetida {entry['count']}x: {entry['sql'][:160]}\n"
+                  f"            em {sites}")
+
+        limit = getattr(app.view_functions.get(request.endpoint), '_query_budget', None)
+        if limit is not None and collector.count > limit:
+            message = (f"{label}: {collector.count} consultas SQL (orçamento: {limit}):\n"
+                       f"{collector.summary()}")
+            if QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            print(f"[consultas] {message}")
+        return response
@@ -0,0 +1,278 @@
+"""
+Reconciliação Planilha x Contas
+===============================
+
+Compara a planilha de funcionários (ver employees.py) com o retrato da
+execução anterior e aplica ao banco apenas as diferenças:
+
+- funcionários que saíram da planilha têm a conta desativada em lote
+  (administradores nunca são desativados);
+- funcionários que voltam à planilha (recontratados) têm a conta
+  desativada reativada, com a senha que já tinham;
+- funcionários cujo nome mudou são sinalizados na auditoria
+  (`ROSTER_RENAME`), sem alterar o nome da conta;
+- novos funcionários podem ser pré-cadastrados (opção --provision ou
+  ROSTER_PROVISION=1) com os sistemas públicos; a senha é definida no
+  cadastro normal do portal.
+
+Cada linha da planilha vira um hash (nome + email). O retrato
+(`var/roster-snapshot.json`) guarda o hash de cada email e o hash do
+arquivo: se a planilha não mudou, nada é feito; caso contrário o banco é
+consultado e alterado só para os emails que mudaram.
+
+Na primeira execução (sem retrato) a comparação é feita contra a tabela
+`users`, mas só como simulação: as contas ativas fora da planilha (inclusive
+as importadas do users.json) são apenas contadas e o retrato passa a ser a
+base das próximas execuções. Para desativá-las de fato, rode com --full, que
+ignora o retrato e aplica a comparação com a tabela `users`.
+
+Uso:
+    python roster_sync.py [--provision] [--dry-run] [--full]
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from audit import audit_writer
+from employees import EMPLOYEES_FILE, load_employee_records
+from models import db, System, User, UserSystemAccess, mark_user_changed
+from runtime import file_lock, runtime_path
+
+SNAPSHOT_FILE = 'roster-snapshot.json'
+
+# Limite de parâmetros por IN (...)
+CHUNK_SIZE = 500
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def file_digest(path=EMPLOYEES_FILE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def row_hash(nome, email):
+    return hashlib.sha1(f"{nome}\x1f{email}".encode('utf-8')).hexdigest()
+
+
+def load_snapshot():
+    """Retrato anterior ({'file': hash, 'rows': {email: hash}}) ou None."""
+    try:
+        with open(runtime_path(SNAPSHOT_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_snapshot(snapshot):
+    path = runtime_path(SNAPSHOT_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, path)
+
+
+def diff_roster(previous, current):
+    """
+    Diferença entre dois mapas email -> hash.
+
+    Returns:
+        tuple: (novos, saídas, alterados) como conjuntos de emails
+    """
+    added = current.keys() - previous.keys()
+    removed = previous.keys() - current.keys()
+    changed = {email for email in current.keys() & previous.keys() if current[email] != previous[email]}
+    return added, removed, changed
+
+
+def _deactivate(emails, dry_run):
+    ids = []
+    for chunk in _chunks(emails):
+        ids.extend(db.session.scalars(
+            select(User.id).where(
+                User.email.in_(chunk),
+                User.is_active == True,  # noqa: E712
+                User.role != 'admin'
+            )
+        ))
+    if ids and not dry_run:
+        for chunk in _chunks(ids):
+            db.session.execute(update(User).where(User.id.in_(chunk)).values(is_active=False))
+        for user_id in ids:
+            mark_user_changed(user_id)
+    return ids
+
+
+def _reactivate(emails, dry_run):
+    """Reativa contas desativadas de funcionários que voltaram à planilha."""
+    ids = []
+    for chunk in _chunks(emails):
+        ids.extend(db.session.scalars(
+            select(User.id).where(User.email.in_(chunk), User.is_active == False)  # noqa: E712
+        ))
+    if ids and not dry_run:
+        for chunk in _chunks(ids):
+            db.session.execute(update(User).where(User.id.in_(chunk)).values(is_active=True))
+        for user_id in ids:
+            mark_user_changed(user_id)
+    return ids
+
+
+def _provision(names, dry_run):
+    """Cria contas (sem senha) para os emails ainda não cadastrados."""
+    existing = set()
+    for chunk in _chunks(names):
+        existing.update(db.session.scalars(select(User.email).where(User.email.in_(chunk))))
+
+    rows = [
+        {'email': email, 'name': nome, 'password_hash': None, 'role': 'user',
+         'is_active': True, 'created_at': datetime.utcnow()}
+        for email, nome in names.items()
+        if email not in existing
+    ]
+    if not rows or dry_run:
+        return [row['email'] for row in rows]
+
+    created = db.session.execute(User.__table__.insert().returning(User.__table__.c.id), rows).scalars().all()
+    public_ids = list(db.session.scalars(select(System.id).where(System.is_public == True)))  # noqa: E712
+    if public_ids:
+        now = datetime.utcnow()
+        db.session.execute(
+            UserSystemAccess.__table__.insert(),
+            [{'user_id': user_id, 'system_id': system_id, 'granted_at': now}
+             for user_id in created for system_id in public_ids]
+        )
+    return [row['email'] for row in rows]
+
+
+def sync_roster(provision=False, dry_run=False, full=False):
+    """
+    Reconcilia a planilha com a tabela `users`. Deve ser chamado dentro de um app context.
+
+    Args:
+        provision (bool): Pré-cadastra novos funcionários
+        dry_run (bool): Apenas calcula as alterações
+        full (bool): Ignora o retrato e compara com a tabela `users`, aplicando
+            as desativações (sem retrato e sem `full`, elas são só contadas)
+
+    Returns:
+        dict: contagens (added, removed, renamed, deactivated, reactivated,
+              provisioned, pending_deactivation) e 'unchanged' = True se a
+              planilha não mudou desde a última execução
+    """
+    with file_lock('roster-sync'):
+        digest = file_digest()
+        snapshot = None if full else load_snapshot()
+        if snapshot and snapshot.get('file') == digest:
+            return {'unchanged': True}
+
+        records = load_employee_records()
+        if records is None:
+            raise RuntimeError("Não foi possível ler a planilha de funcionários.")
+
+        names = {email: nome for nome, email in records}
+        current = {email: row_hash(nome, email) for nome, email in records}
+
+        pending = []
+        if snapshot is not None:
+            added, removed, renamed = diff_roster(snapshot.get('rows', {}), current)
+        else:
+            # Sem retrato, o "retrato anterior" são as contas ativas
+            accounts = set(db.session.scalars(select(User.email).where(User.is_active == True)))  # noqa: E712
+            added = current.keys() - accounts
+            removed = accounts - current.keys()
+            renamed = set()
+
+        if snapshot is None and not full:
+            # Primeira execução: não desativa sem confirmação explícita (--full)
+            pending = _deactivate(removed, dry_run=True)
+            deactivated = []
+        else:
+            deactivated = _deactivate(removed, dry_run)
+        # Contas desativadas antes da primeira execução só voltam com --full
+        reactivated = _reactivate(added, dry_run) if snapshot is not None or full else []
+        provisioned = _provision({email: names[email] for email in added}, dry_run) if provision else []
+
+        renamed_users = []
+        for chunk in _chunks(renamed):
+            renamed_users.extend(db.session.execute(
+                select(User.id, User.email, User.name).where(User.email.in_(chunk))
+            ))
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            entries = [
+                {'action': 'ROSTER_RENAME', 'actor_id': None, 'target_id': f"User:{user_id}",
+                 'meta_info': {'email': email, 'account_name': name, 'roster_name': names[email]}}
+                for user_id, email, name in renamed_users
+            ]
+            if deactivated:
+                entries.append({'action': 'ROSTER_DEACTIVATE', 'actor_id': None, 'target_id': 'Roster',
+                                'meta_info': {'users': deactivated, 'count': len(deactivated)}})
+            if reactivated:
+                entries.append({'action': 'ROSTER_REACTIVATE', 'actor_id': None, 'target_id': 'Roster',
+                                'meta_info': {'users': reactivated, 'count': len(reactivated)}})
+            if provisioned:
+                entries.append({'action': 'ROSTER_PROVISION', 'actor_id': None, 'target_id': 'Roster',
+                                'meta_info': {'emails': provisioned, 'count': len(provisioned)}})
+            audit_writer.log_many(entries)
+            db.session.commit()
+            save_snapshot({'file': digest, 'rows': current, 'synced_at': datetime.utcnow().isoformat()})
+
+    return {
+        'unchanged': False,
+        'added': len(added),
+        'removed': len(removed),
+        'renamed': len(renamed_users),
+        'deactivated': len(deactivated),
+        'reactivated': len(reactivated),
+        'provisioned': len(provisioned),
+        'pending_deactivation': len(pending),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reconcilia a planilha de funcionários com as contas')
+    parser.add_argument('--provision', action='store_true',
+                        default=os.environ.get('ROSTER_PROVISION', '').lower() in ('1', 'true', 'yes'),
+                        help='pré-cadastra novos funcionários com os sistemas públicos')
+    parser.add_argument('--dry-run', action='store_true', help='apenas mostra o que seria alterado')
+    parser.add_argument('--full', action='store_true',
+                        help='ignora o retrato anterior e desativa as contas ativas fora da planilha')
+    args = parser.parse_args()
+
+    from app import app
+
+    started = time.perf_counter()
+    with app.app_context():
+        result = sync_roster(provision=args.provision, dry_run=args.dry_run, full=args.full)
+        audit_writer.flush()
+
+    elapsed = time.perf_counter() - started
+    if result['unchanged']:
+        print(f"Planilha sem alterações ({elapsed:.2f}s).")
+    else:
+        prefix = "[simulação] " if args.dry_run else ""
+        print(f"{prefix}{result['added']} novos, {result['removed']} saídas, {result['renamed']} renomeados; "
+              f"{result['deactivated']} contas desativadas, {result['reactivated']} reativadas, "
+              f"{result['provisioned']} pré-cadastradas ({elapsed:.2f}s).")
+        if result['pending_deactivation']:
+            print(f"Primeira execução: {result['pending_deactivation']} contas ativas não estão na planilha "
+                  f"e NÃO foram desativadas. Confira e rode com --full para desativá-las.")
@@ -0,0 +1,74 @@
+"""
+Arquivos de Runtime Compartilhados
+==================================
+
+Diretório e utilitários para arquivos locais compartilhados entre os
+workers do gunicorn (contadores de versão, caches em disco, etc.).
+
+O diretório padrão é `var/` ao lado da aplicação e pode ser alterado com a
+variável de ambiente PORTAL_RUNTIME_DIR.
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows (ambiente de desenvolvimento)
+    fcntl = None
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+RUNTIME_DIR = os.environ.get('PORTAL_RUNTIME_DIR', os.path.join(BASE_DIR, 'var'))
+
+# Sem fcntl, o lock vale apenas para as threads do próprio processo
+_fallback_lock = threading.RLock()
+
+
+def runtime_path(*parts):
+    """
+    Retorna um caminho dentro do diretório de runtime, criando as pastas.
+
+    Args:
+        *parts: Componentes do caminho relativos a RUNTIME_DIR
+
+    Returns:
+        str: Caminho absoluto
+    """
+    path = os.path.join(RUNTIME_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+@contextmanager
+def locked_fd(fd):
+    """Lock exclusivo (entre processos) sobre um descritor de arquivo aberto."""
+    if fcntl is None:
+        with _fallback_lock:
+            yield
+        return
+
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(name):
+    """
+    Lock exclusivo entre processos baseado em um arquivo em RUNTIME_DIR.
+
+    Args:
+        name (str): Nome do arquivo de lock (ex.: 'migrations.lock')
+    """
+    fd = os.open(runtime_path(name), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        with locked_fd(fd):
+            yield
+    finally:
+        os.close(fd)
@@ -0,0 +1,120 @@
+"""
+Perfil do Engine SQLite
+=======================
+
+Configuração do SQLAlchemy para servir o SQLite com vários workers do
+gunicorn. Selecionado pela variável de ambiente SQLITE_PROFILE:
+
+- `tuned` (padrão): journal WAL (leitores não bloqueiam o escritor),
+  `synchronous=NORMAL`, `busy_timeout` (espera o lock de escrita em vez de
+  falhar com "database is locked"), `mmap_size`, `cache_size` e
+  `temp_store=MEMORY`, aplicados em toda conexão nova do pool. O pool
+  mantém poucas conexões por processo e é descartado no filho após um
+  fork, para que nenhum processo reutilize conexões abertas por outro.
+- `default`: configuração padrão do SQLAlchemy/SQLite (comparação).
+
+Os valores podem ser ajustados com SQLITE_BUSY_TIMEOUT_MS,
+SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE e SQLITE_POOL_SIZE.
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import os
+
+from sqlalchemy import create_engine, event
+
+PROFILES = ('tuned', 'default')
+
+
+def profile_name():
+    name = os.environ.get('SQLITE_PROFILE', 'tuned').lower()
+    return name if name in PROFILES else 'tuned'
+
+
+def pragmas(profile=None):
+    """
+    PRAGMAs aplicados a cada conexão no perfil informado.
+
+    Returns:
+        list: [(pragma, valor)] na ordem de aplicação
+    """
+    if (profile or profile_name()) != 'tuned':
+        return []
+    return [
+        ('journal_mode', 'WAL'),
+        ('synchronous', os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('busy_timeout', int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))),
+        ('mmap_size', int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))),
+        # Negativo = tamanho em KiB (16 MiB)
+        ('cache_size', int(os.environ.get('SQLITE_CACHE_SIZE', -16000))),
+        ('temp_store', 'MEMORY'),
+    ]
+
+
+def engine_options(url, profile=None):
+    """
+    Opções de `create_engine` para a URL informada.
+
+    Returns:
+        dict: opções (vazio para bancos que não são SQLite ou perfil `default`)
+    """
+    if not url.startswith('sqlite') or (profile or profile_name()) != 'tuned':
+        return {}
+    if ':memory:' in url or url.rstrip('/') == 'sqlite:':
+        return {}
+
+    busy_seconds = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)) / 1000
+    return {
+        # Workers síncronos usam uma conexão por vez; threads de fundo
+        # (auditoria, outbox) precisam de poucas conexões extras
+        'pool_size': int(os.environ.get('SQLITE_POOL_SIZE', 5)),
+        'max_overflow': 5,
+        'pool_timeout': busy_seconds + 5,
+        'connect_args': {'timeout': busy_seconds, 'check_same_thread': False},
+    }
+
+
+def install(engine, profile=None):
+    """Registra os PRAGMAs do perfil no engine e o descarte do pool após fork."""
+    if engine.dialect.name != 'sqlite':
+        return
+    settings = pragmas(profile)
+    if not settings:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in settings:
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+
+    # Conexões herdadas do processo pai não podem ser usadas pelo filho
+    # (hashing com fork, gunicorn --preload); close=False não as fecha no pai
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
+
+def init_app(app, db):
+    """
+    Aplica o perfil ao Flask-SQLAlchemy. Chamar no lugar de `db.init_app(app)`.
+    """
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    options = engine_options(url)
+    if options:
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).update(options)
+
+    db.init_app(app)
+
+    with app.app_context():
+        install(db.engine)
+
+
+def make_engine(url, profile=None):
+    """Engine avulso com o perfil informado (scripts e benchmark)."""
+    engine = create_engine(url, **engine_options(url, profile))
+    install(engine, profile)
+    return engine
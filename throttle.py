@@ -0,0 +1,220 @@
+"""
+Limitação de Tentativas (Throttling)
+====================================
+
+Janelas deslizantes por IP e por email para /login, /register e
+/forgot-password. As requisições recusadas são respondidas antes de
+qualquer consulta ao banco, leitura da planilha ou cálculo de hash.
+
+Cada limitador é uma tabela hash de tamanho fixo em um arquivo mapeado em
+memória (compartilhado entre os workers do gunicorn). Cada entrada guarda
+um buffer circular com os horários das últimas `limit` tentativas da chave:
+a tentativa é aceita se a mais antiga delas já saiu da janela. Quando a
+tabela enche, a entrada menos recente entre as sondadas é descartada, então
+a memória fica limitada a `slots * (16 + 4 * limit)` bytes por limitador.
+
+Regras (variáveis de ambiente no formato "tentativas/segundos"):
+    THROTTLE_LOGIN_IP        padrão 30/300 (só logins com senha errada)
+    THROTTLE_LOGIN_EMAIL     padrão 10/300 (só logins com senha errada)
+    THROTTLE_REGISTER_IP     padrão 10/3600
+    THROTTLE_FORGOT_IP       padrão 10/3600
+    THROTTLE_FORGOT_EMAIL    padrão 3/3600
+    THROTTLE_ENABLED         0 desativa todas as regras
+
+Logins bem-sucedidos não contam para os limites de login (nem por IP nem
+por conta): vários funcionários atrás do mesmo NAT entrando no início do
+expediente não se bloqueiam, nem quem entra várias vezes seguidas. Se um
+escritório ainda assim esbarrar no limite (muitas senhas erradas no mesmo
+IP), aumente THROTTLE_LOGIN_IP, ex.: "100/300".
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+from runtime import runtime_path, locked_fd
+
+MAGIC = b'MGTHR001'
+HEADER = struct.Struct('<8sII')
+
+
+class SlidingWindowLimiter:
+    """Limitador de janela deslizante compartilhado via mmap."""
+
+    def __init__(self, name, limit, window, slots=4096, probes=4):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.slots = slots
+        self.probes = probes
+        # chave (hash), posição do próximo registro, último registro, buffer
+        self._entry = struct.Struct(f'<QII{limit}I')
+        self.size = HEADER.size + self._entry.size * slots
+        self.path = runtime_path(f'throttle-{name}-{limit}x{slots}.bin')
+        self._fd = None
+        self._map = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._map is not None and self._pid == os.getpid():
+            return self._map
+
+        with self._lock:
+            if self._map is not None and self._pid == os.getpid():
+                return self._map
+
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            with locked_fd(fd):
+                if os.fstat(fd).st_size < self.size:
+                    os.ftruncate(fd, self.size)
+                buf = mmap.mmap(fd, self.size)
+                if buf[:len(MAGIC)] != MAGIC:
+                    HEADER.pack_into(buf, 0, MAGIC, self.slots, self.limit)
+
+            self._fd = fd
+            self._map = buf
+            self._pid = os.getpid()
+            return self._map
+
+    def _offset(self, index):
+        return HEADER.size + self._entry.size * index
+
+    @staticmethod
+    def _key_hash(key):
+        # 0 marca entrada vazia
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+    def _find(self, buf, key_hash, now):
+        """Localiza a entrada da chave ou escolhe uma para reutilizar."""
+        start = key_hash % self.slots
+        candidates = []
+        for i in range(self.probes):
+            index = (start + i) % self.slots
+            stored_key, _head, newest = struct.unpack_from('<QII', buf, self._offset(index))
+            # A chave pode estar numa sondagem posterior a uma entrada livre
+            # ou expirada: procura em todas antes de reutilizar alguma
+            if stored_key == key_hash:
+                return index, True
+            candidates.append((index, stored_key, newest))
+
+        victim = None
+        victim_newest = None
+        for index, stored_key, newest in candidates:
+            if stored_key == 0 or newest + self.window <= now:
+                return index, False
+            if victim is None or newest < victim_newest:
+                victim, victim_newest = index, newest
+        return victim, False
+
+    def hit(self, key, record=True):
+        """
+        Registra uma tentativa para a chave.
+
+        Args:
+            key: Chave limitada (IP, email)
+            record: False apenas consulta, sem registrar a tentativa
+
+        Returns:
+            bool: True se a tentativa está dentro do limite
+        """
+        buf = self._open()
+        now = int(time.time())
+        key_hash = self._key_hash(key)
+
+        with self._lock, locked_fd(self._fd):
+            index, found = self._find(buf, key_hash, now)
+            offset = self._offset(index)
+
+            if found:
+                values = self._entry.unpack_from(buf, offset)
+                head, ring = values[1], list(values[3:])
+            else:
+                head, ring = 0, [0] * self.limit
+
+            # ring[head] é a tentativa mais antiga das últimas `limit`
+            if ring[head] and ring[head] + self.window > now:
+                return False
+            if not record:
+                return True
+
+            ring[head] = now
+            self._entry.pack_into(buf, offset, key_hash, (head + 1) % self.limit, now, *ring)
+            return True
+
+
+def _parse_rule(env_name, default):
+    limit, window = os.environ.get(env_name, default).split('/')
+    return int(limit), int(window)
+
+
+THROTTLE_ENABLED = os.environ.get('THROTTLE_ENABLED', '1').lower() not in ('0', 'false', 'no')
+
+RULES = {
+    'login_ip': _parse_rule('THROTTLE_LOGIN_IP', '30/300'),
+    'login_email': _parse_rule('THROTTLE_LOGIN_EMAIL', '10/300'),
+    'register_ip': _parse_rule('THROTTLE_REGISTER_IP', '10/3600'),
+    'forgot_ip': _parse_rule('THROTTLE_FORGOT_IP', '10/3600'),
+    'forgot_email': _parse_rule('THROTTLE_FORGOT_EMAIL', '3/3600'),
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(rule):
+    """Retorna (criando sob demanda) o limitador de uma regra."""
+    limiter = _limiters.get(rule)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(rule)
+            if limiter is None:
+                limit, window = RULES[rule]
+                limiter = _limiters[rule] = SlidingWindowLimiter(rule.replace('_', '-'), limit, window)
+    return limiter
+
+
+def is_throttled(*checks):
+    """
+    Verifica uma ou mais regras de uma vez.
+
+    Args:
+        *checks: Pares (regra, chave), ex.: ('login_ip', '10.0.0.1')
+
+    Returns:
+        bool: True se alguma regra estourou o limite
+    """
+    if not THROTTLE_ENABLED:
+        return False
+
+    for rule, key in checks:
+        if key and not get_limiter(rule).hit(key):
+            return True
+    return False
+
+
+def is_blocked(*checks):
+    """Como `is_throttled`, mas só consulta: não registra tentativas."""
+    if not THROTTLE_ENABLED:
+        return False
+
+    for rule, key in checks:
+        if key and not get_limiter(rule).hit(key, record=False):
+            return True
+    return False
+
+
+def record_failure(*checks):
+    """Registra tentativas que falharam (ex.: senha errada) nas regras dadas."""
+    if not THROTTLE_ENABLED:
+        return
+
+    for rule, key in checks:
+        if key:
+            get_limiter(rule).hit(key)
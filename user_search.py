@@ -0,0 +1,167 @@
+"""
+Busca de Usuários
+=================
+
+Índice de texto completo (SQLite FTS5, tokenizer trigram) sobre nome e
+email da tabela `users`, mantido por triggers, e listagem paginada por
+cursor (keyset) em ordem de nome.
+
+O trigram encontra qualquer trecho com 3 ou mais caracteres, sem
+diferenciar maiúsculas, equivalente ao `ilike('%termo%')` anterior mas sem
+varrer a tabela. Termos menores, bancos que não são SQLite ou SQLite sem
+FTS5/trigram (anterior ao 3.34) usam o LIKE como alternativa.
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import base64
+
+from sqlalchemy import column, func, select, table, text
+from sqlalchemy.exc import OperationalError
+
+from models import db, User
+
+FTS_TABLE = 'users_fts'
+MIN_TRIGRAM_LENGTH = 3
+
+_users_fts = table(FTS_TABLE, column('rowid'))
+
+DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, email, content='users', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF name, email ON users BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+        INSERT INTO {FTS_TABLE}(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END""",
+]
+
+_fts_available = None
+
+
+def ensure_user_search_index(engine):
+    """
+    Cria o índice FTS e os triggers, se ainda não existirem.
+
+    Returns:
+        bool: True se o índice FTS está disponível
+    """
+    global _fts_available
+    if engine.dialect.name != 'sqlite':
+        _fts_available = False
+        return False
+
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        if not exists:
+            try:
+                for statement in DDL:
+                    conn.execute(text(statement))
+                # Indexa os usuários já existentes
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            except OperationalError as e:
+                print(f"Busca de usuários sem FTS5/trigram ({e}); usando LIKE.")
+                _fts_available = False
+                return False
+
+    _fts_available = True
+    return True
+
+
+def _fts_ready():
+    global _fts_available
+    if _fts_available is None:
+        if db.engine.dialect.name != 'sqlite':
+            _fts_available = False
+        else:
+            _fts_available = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': FTS_TABLE}
+            ).first() is not None
+    return _fts_available
+
+
+def _fts_query(term):
+    # Frase entre aspas: o trigram busca o trecho literal
+    return '"' + term.replace('"', '""') + '"'
+
+
+def matching_user_ids(term):
+    """
+    Subconsulta com os IDs dos usuários cujo nome/email contém o termo.
+
+    Usa o índice FTS quando possível (mesmas regras de `search_users`).
+
+    Returns:
+        Select: SELECT de IDs, utilizável em `User.id.in_(...)`
+    """
+    term = (term or '').strip()
+    if len(term) >= MIN_TRIGRAM_LENGTH and _fts_ready():
+        return select(_users_fts.c.rowid).where(
+            text(f"{FTS_TABLE} MATCH :fts_term")
+        ).params(fts_term=_fts_query(term))
+
+    pattern = f'%{term}%'
+    return select(User.id).where(User.name.ilike(pattern) | User.email.ilike(pattern))
+
+
+def encode_cursor(user):
+    return base64.urlsafe_b64encode(f"{user.id}|{user.name}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Retorna (nome, id) ou None se o cursor for inválido."""
+    try:
+        user_id, name = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+        return name, int(user_id)
+    except (ValueError, UnicodeDecodeError, AttributeError):
+        return None
+
+
+def search_users(term='', cursor=None, limit=50):
+    """
+    Lista usuários em ordem de nome, opcionalmente filtrando por nome/email.
+
+    Deve ser chamado dentro de um app context.
+
+    Args:
+        term (str): Trecho do nome ou email
+        cursor (str): Cursor devolvido pela página anterior
+        limit (int): Tamanho da página
+
+    Returns:
+        tuple: (lista de User, total de resultados, cursor da próxima página ou None)
+    """
+    term = (term or '').strip()
+    query = User.query
+    count_query = None
+
+    if term and len(term) >= MIN_TRIGRAM_LENGTH and _fts_ready():
+        query = query.filter(User.id.in_(matching_user_ids(term).scalar_subquery()))
+        # Total direto do índice, sem tocar na tabela users
+        count_query = db.session.query(func.count()).select_from(_users_fts).filter(
+            text(f"{FTS_TABLE} MATCH :fts_term")
+        ).params(fts_term=_fts_query(term))
+    elif term:
+        pattern = f'%{term}%'
+        query = query.filter(User.name.ilike(pattern) | User.email.ilike(pattern))
+
+    total = count_query.scalar() if count_query is not None else query.order_by(None).count()
+
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None:
+        query = query.filter(db.tuple_(User.name, User.id) > after)
+
+    users = query.order_by(User.name, User.id).limit(limit + 1).all()
+    next_cursor = encode_cursor(users[limit - 1]) if len(users) > limit else None
+    return users[:limit], total, next_cursor
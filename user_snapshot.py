@@ -0,0 +1,114 @@
+"""
+Snapshot do Usuário na Sessão
+=============================
+
+Permite autenticar requests sem consultar o banco: a sessão assinada do
+Flask carrega um retrato compacto do usuário (id, nome, email, role,
+status e os IDs dos sistemas concedidos explicitamente) carimbado com a
+versão do usuário e do catálogo (ver `versions.py`). Guarda IDs, e não
+posições no catálogo, porque a ordem em que cada worker carrega o catálogo
+não é garantida.
+
+Enquanto as versões não mudarem, `load_user` devolve um `SessionUser`
+montado a partir do snapshot. Qualquer alteração confirmada no usuário ou
+nas suas permissões incrementa a versão e força a recarga do banco.
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+from flask_login import UserMixin
+
+import versions
+from catalog import get_catalog
+from models import db, UserSystemAccess
+
+SESSION_KEY = '_user_snapshot'
+
+
+def build_snapshot(user, resolved_systems, catalog, user_version, epoch):
+    """
+    Monta o snapshot de um usuário recém-carregado do banco.
+
+    As versões devem ter sido lidas ANTES da carga do usuário, para que uma
+    alteração concorrente invalide o snapshot em vez de ser perdida.
+
+    Args:
+        user (User): Usuário carregado do banco
+        resolved_systems (list): Resultado de `user.load_permissions(catalog)`
+        catalog (Catalog): Catálogo usado na resolução
+        user_version (int): Versão do usuário lida antes da carga
+        epoch (int): Epoch do arquivo de versões
+
+    Returns:
+        dict: Snapshot serializável em JSON
+    """
+    granted_ids = sorted(system.id for system, granted in resolved_systems if granted)
+
+    return {
+        'i': user.id,
+        'n': user.name,
+        'e': user.email,
+        'r': user.role,
+        'a': bool(user.is_active),
+        'g': granted_ids,
+        'v': user_version,
+        'c': catalog.version,
+        'x': epoch,
+    }
+
+
+def is_current(snapshot, user_id):
+    """Verifica se o snapshot pertence ao usuário e ainda está válido."""
+    try:
+        return (
+            snapshot['i'] == user_id
+            and 'g' in snapshot  # formato antigo (bitmap) é descartado
+            and snapshot['x'] == versions.epoch()
+            and snapshot['v'] == versions.user_version(user_id)
+            and snapshot['c'] == versions.catalog_version()
+        )
+    except (KeyError, TypeError):
+        return False
+
+
+class SessionUser(UserMixin):
+    """Usuário reconstruído a partir do snapshot da sessão (somente leitura)"""
+
+    def __init__(self, snapshot):
+        self.id = snapshot['i']
+        self.name = snapshot['n']
+        self.email = snapshot['e']
+        self.role = snapshot['r']
+        self._active = snapshot['a']
+        self._granted_ids = frozenset(snapshot['g'])
+        self._catalog_version = snapshot['c']
+
+    @property
+    def is_active(self):
+        return self._active
+
+    def load_permissions(self, catalog=None):
+        """Mesmo contrato de `User.load_permissions`, a partir dos IDs do snapshot."""
+        if catalog is None:
+            catalog = get_catalog()
+
+        if catalog.version == self._catalog_version:
+            granted_ids = {system.id for system in catalog.systems if system.id in self._granted_ids}
+        else:
+            # Catálogo mudou depois do snapshot: relê as concessões do banco
+            granted_ids = {
+                system_id for (system_id,) in
+                db.session.query(UserSystemAccess.system_id).filter_by(user_id=self.id)
+            }
+
+        self._cached_permissions = catalog.public_ids | granted_ids
+        return [(system, system.id in granted_ids) for system in catalog.systems]
+
+    def has_access(self, system_id):
+        """Verifica se o usuário tem acesso a um sistema específico"""
+        if self.role == 'admin':
+            return True
+        if not hasattr(self, '_cached_permissions'):
+            self.load_permissions()
+        return system_id in self._cached_permissions
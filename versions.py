@@ -0,0 +1,149 @@
+"""
+Contadores de Versão Compartilhados
+===================================
+
+Contadores monotônicos guardados em um arquivo mapeado em memória (mmap),
+visíveis para todos os workers do gunicorn sem consulta ao banco.
+
+Caches em processo usam a versão como parte da chave ou como carimbo:
+quando algo muda, quem alterou incrementa o contador e os demais workers
+percebem na próxima leitura (uma leitura de 8 bytes).
+
+Layout do arquivo:
+    [magic 8 bytes][epoch uint64][slots uint64...]
+
+O epoch é sorteado na criação do arquivo; ele muda se o arquivo for
+recriado, invalidando carimbos gravados antes (ex.: em cookies).
+
+Versões por usuário usam slots indexados por `user_id % USER_SLOTS`. Dois
+usuários podem compartilhar um slot; nesse caso uma alteração em um deles
+apenas força uma recarga desnecessária do outro, nunca um dado velho.
+
+Autor: Núcleo Digital MG
+Data: 2026-10-16
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+
+from runtime import runtime_path, locked_fd
+
+MAGIC = b'MGVER001'
+HEADER = struct.Struct('<8sQ')
+SLOT = struct.Struct('<Q')
+
+# Slots fixos
+CATALOG_SLOT = 0
+FIXED_SLOTS = 1
+
+# Slots de versão de permissão por usuário (512 KB de arquivo)
+USER_SLOTS = 65536
+
+
+class VersionTable:
+    """Tabela de contadores uint64 compartilhada via mmap."""
+
+    def __init__(self, path, slots):
+        self.path = path
+        self.slots = slots
+        self.size = HEADER.size + SLOT.size * slots
+        self._fd = None
+        self._map = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _create(self):
+        """Cria o arquivo com um novo epoch (apenas um processo vence a corrida)."""
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return
+        try:
+            epoch = int.from_bytes(os.urandom(8), 'little')
+            os.write(fd, HEADER.pack(MAGIC, epoch) + b'\0' * (self.size - HEADER.size))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _open(self):
+        if self._map is not None and self._pid == os.getpid():
+            return self._map
+
+        with self._lock:
+            if self._map is not None and self._pid == os.getpid():
+                return self._map
+
+            self._create()
+            fd = os.open(self.path, os.O_RDWR)
+            # Outro processo pode estar terminando de escrever o cabeçalho
+            deadline = time.monotonic() + 2.0
+            while os.fstat(fd).st_size < self.size and time.monotonic() < deadline:
+                time.sleep(0.01)
+            if os.fstat(fd).st_size < self.size:
+                os.close(fd)
+                raise RuntimeError(f'Arquivo de versões inválido: {self.path}')
+
+            self._fd = fd
+            self._map = mmap.mmap(fd, self.size)
+            self._pid = os.getpid()
+            return self._map
+
+    @property
+    def epoch(self):
+        return HEADER.unpack_from(self._open(), 0)[1]
+
+    def get(self, slot):
+        """Lê o valor atual de um slot."""
+        return SLOT.unpack_from(self._open(), HEADER.size + SLOT.size * slot)[0]
+
+    def bump(self, slot):
+        """Incrementa um slot de forma atômica entre processos e retorna o novo valor."""
+        buf = self._open()
+        offset = HEADER.size + SLOT.size * slot
+        with self._lock, locked_fd(self._fd):
+            value = SLOT.unpack_from(buf, offset)[0] + 1
+            SLOT.pack_into(buf, offset, value)
+        return value
+
+    def bump_many(self, slots):
+        """Incrementa vários slots sob um único lock."""
+        buf = self._open()
+        with self._lock, locked_fd(self._fd):
+            for slot in slots:
+                offset = HEADER.size + SLOT.size * slot
+                SLOT.pack_into(buf, offset, SLOT.unpack_from(buf, offset)[0] + 1)
+
+
+_table = VersionTable(runtime_path('versions-v2.bin'), FIXED_SLOTS + USER_SLOTS)
+
+
+def _user_slot(user_id):
+    return FIXED_SLOTS + int(user_id) % USER_SLOTS
+
+
+def epoch():
+    """Identificador da instância atual do arquivo de versões."""
+    return _table.epoch
+
+
+def catalog_version():
+    """Versão atual do catálogo de sistemas."""
+    return _table.get(CATALOG_SLOT)
+
+
+def bump_catalog_version():
+    """Sinaliza que o catálogo de sistemas mudou."""
+    return _table.bump(CATALOG_SLOT)
+
+
+def user_version(user_id):
+    """Versão atual dos dados/permissões de um usuário."""
+    return _table.get(_user_slot(user_id))
+
+
+def bump_user_versions(user_ids):
+    """Sinaliza que dados ou permissões dos usuários informados mudaram."""
+    _table.bump_many(sorted({_user_slot(uid) for uid in user_ids}))